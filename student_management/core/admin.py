@@ -1,11 +1,64 @@
 from django.contrib import admin
-from .models import Class, Division, Teacher, ClassSection, Subject, Student, Exam, Mark
+from .archive import purge_class_section, purge_exam
+from .models import Class, Division, Teacher, ClassSection, Subject, Student, Exam, Mark, Job, ArchivedExam
+
+
+class PurgingAdmin(admin.ModelAdmin):
+    """Deletes through core.archive's batched SQL instead of collecting every dependent mark."""
+    purge = None
+    # Dependent models and the lookup from them to the deleted objects
+    dependents = ()
+
+    def delete_model(self, request, obj):
+        self.purge(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.purge(obj)
+
+    def get_deleted_objects(self, objs, request):
+        # The default lists every dependent mark on the confirmation page
+        objs = list(objs)
+        model_count = {self.model._meta.verbose_name_plural: len(objs)}
+        perms_needed = set()
+        for model, lookup in self.dependents:
+            count = model.objects.filter(**{f'{lookup}__in': objs}).count()
+            if count:
+                model_count[model._meta.verbose_name_plural] = count
+                if not request.user.has_perm(f'{model._meta.app_label}.delete_{model._meta.model_name}'):
+                    perms_needed.add(model._meta.verbose_name)
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+
+class ExamAdmin(PurgingAdmin):
+    purge = staticmethod(purge_exam)
+    dependents = ((Mark, 'exam'),)
+
+
+class ClassSectionAdmin(PurgingAdmin):
+    purge = staticmethod(purge_class_section)
+    dependents = ((Student, 'class_section'), (Mark, 'student__class_section'))
+
+
+class ArchivedExamAdmin(admin.ModelAdmin):
+    list_display = ('name', 'date', 'mark_count', 'archived_at')
+    # Archives are read-only; large ones are better browsed under Archived Exams
+    readonly_fields = ('exam_id', 'name', 'date', 'mark_count', 'archived_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 admin.site.register(Class)
 admin.site.register(Division)
 admin.site.register(Teacher)
-admin.site.register(ClassSection)
+admin.site.register(ClassSection, ClassSectionAdmin)
 admin.site.register(Subject)
 admin.site.register(Student)
-admin.site.register(Exam)
+admin.site.register(Exam, ExamAdmin)
 admin.site.register(Mark)
+admin.site.register(Job)
+admin.site.register(ArchivedExam, ArchivedExamAdmin)
@@ -0,0 +1,116 @@
+"""
+Per-exam mark distributions: mean, median, standard deviation, histogram and
+pass rate for every subject, overall and per section. One DataFrame over the
+exam's marks is grouped by (subject, section) instead of running an aggregate
+query per pair. Results are cached under a per-exam version that mark writes
+bump, plus a global one for renames and students changing section.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache_versions import bump, version
+from .models import ClassSection, Subject
+from .results import MAX_MARKS_PER_SUBJECT, load_exam_marks
+
+# Overridable in settings.py
+PASS_PERCENTAGE = getattr(settings, 'ANALYTICS_PASS_PERCENTAGE', 40)
+BUCKET_WIDTH = getattr(settings, 'ANALYTICS_BUCKET_WIDTH', 10)
+ANALYTICS_TIMEOUT = 24 * 60 * 60
+VERSION_KEY = 'exam-analytics:version'
+
+
+def _exam_version_key(exam_id):
+    return f'{VERSION_KEY}:{exam_id}'
+
+
+def invalidate_exams(exam_ids):
+    keys = {_exam_version_key(exam_id) for exam_id in exam_ids}
+    transaction.on_commit(lambda: [bump(key) for key in keys])
+
+
+def invalidate_all_exams():
+    transaction.on_commit(lambda: bump(VERSION_KEY))
+
+
+def bucket_labels():
+    edges = list(range(0, 100, BUCKET_WIDTH))
+    return [f'{low}-{min(low + BUCKET_WIDTH, 100)}' for low in edges]
+
+
+def _summaries(df, by):
+    """One dict of statistics per group of `by` columns, keyed by the group's values."""
+    import numpy as np
+
+    grouped = df.groupby(by, sort=False)
+    stats = grouped['marks'].agg(['size', 'mean', 'median', 'std', 'min', 'max'])
+    stats['passed'] = grouped['passed'].sum()
+    # Bucket counts as one column per bucket, zero-filled
+    histogram = df.groupby(by + ['bucket'], observed=False).size().unstack(fill_value=0)
+    histogram = histogram.reindex(stats.index, fill_value=0)
+    summaries = {}
+    for key, row, counts in zip(stats.index, stats.itertuples(index=False), histogram.to_numpy()):
+        std = 0.0 if np.isnan(row.std) else row.std
+        summaries[key] = {
+            'count': int(row.size),
+            'mean': round(float(row.mean), 2),
+            'median': round(float(row.median), 2),
+            'std': round(float(std), 2),
+            'min': float(row.min),
+            'max': float(row.max),
+            'passed': int(row.passed),
+            'pass_rate': round(100 * row.passed / row.size, 1),
+            'fail_rate': round(100 - 100 * row.passed / row.size, 1),
+            'histogram': [int(count) for count in counts],
+        }
+    return summaries
+
+
+def compute_exam_analytics(exam):
+    """Every subject's distribution for one exam, school-wide and per section, as plain JSON-ready data."""
+    import pandas as pd
+
+    started = time.perf_counter()
+    data = {
+        'exam': {'id': exam.pk, 'name': exam.name, 'date': exam.date.isoformat()},
+        'max_marks': MAX_MARKS_PER_SUBJECT,
+        'pass_percentage': PASS_PERCENTAGE,
+        'buckets': bucket_labels(),
+        'subjects': [],
+    }
+    df = load_exam_marks(exam)
+    if not df.empty:
+        percentages = df['marks'] / MAX_MARKS_PER_SUBJECT * 100
+        df['passed'] = percentages >= PASS_PERCENTAGE
+        edges = list(range(0, 100, BUCKET_WIDTH)) + [float('inf')]
+        df['bucket'] = pd.cut(percentages.clip(lower=0), edges, right=False, labels=data['buckets'])
+        overall = _summaries(df, ['subject'])
+        by_section = _summaries(df, ['subject', 'section'])
+        subjects = dict(Subject.objects.filter(pk__in=overall).values_list('pk', 'name'))
+        sections = {
+            section.pk: str(section)
+            for section in ClassSection.objects.filter(pk__in=df['section'].unique().tolist()).select_related(
+                'school_class', 'division')
+        }
+        for subject_id in sorted(overall, key=lambda pk: subjects.get(pk, '')):
+            section_rows = [
+                dict(section_id=int(section_id), section=sections.get(section_id, ''), **summary)
+                for (subject, section_id), summary in by_section.items() if subject == subject_id
+            ]
+            section_rows.sort(key=lambda row: row['section'])
+            data['subjects'].append(dict(
+                subject_id=int(subject_id), subject=subjects.get(subject_id, ''),
+                sections=section_rows, **overall[subject_id]))
+    data['seconds'] = round(time.perf_counter() - started, 3)
+    return data
+
+
+def get_exam_analytics(exam):
+    key = f'exam-analytics:{exam.pk}:{version(_exam_version_key(exam.pk))}:{version(VERSION_KEY)}'
+    data = cache.get(key)
+    if data is None:
+        data = compute_exam_analytics(exam)
+        cache.set(key, data, ANALYTICS_TIMEOUT)
+    return data
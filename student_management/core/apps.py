@@ -1,6 +1,39 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def local_cache_problems():
+    """Why the per-process locmem cache cannot serve this configuration; empty when it can."""
+    problems = []
+    if not settings.DEBUG:
+        problems.append('more than one worker process may serve requests (DEBUG is off)')
+    if not getattr(settings, 'JOBS_INLINE', False):
+        # Imports run by `manage.py run_jobs` must invalidate what the web processes cached
+        problems.append('background jobs run in separate run_jobs processes (SMS_JOBS_INLINE is off)')
+    if 'core.auth.CachedModelBackend' in settings.AUTHENTICATION_BACKENDS:
+        # Stale users would keep revoked passwords, is_active and is_staff alive in other processes
+        problems.append('core.auth.CachedModelBackend caches users across requests')
+    return problems
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .metrics import install_query_recorder
+
+        connection_created.connect(install_query_recorder, dispatch_uid='core.metrics')
+        if settings.CACHES['default']['BACKEND'] == LOCMEM_CACHE:
+            # Invalidation only reaches the writing process's own locmem cache
+            problems = local_cache_problems()
+            if problems:
+                raise ImproperlyConfigured(
+                    f'SMS_CACHE=locmem is per process, but {"; ".join(problems)}. '
+                    'Use SMS_CACHE=file or a redis:// URL.')
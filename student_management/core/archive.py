@@ -0,0 +1,101 @@
+"""
+Archival and fast deletion of exams. Deleting through the ORM collects every
+dependent Mark in Python first (Mark has delete signals, so Django cannot
+fast-delete them), which takes minutes for a large exam. Here marks and
+results are removed with batched DELETE statements instead, and archive_exam()
+first copies the marks into ArchivedMark with a single INSERT ... SELECT.
+"""
+from django.conf import settings
+from django.db import connections
+
+from .database import WRITE_DB, write_transaction
+from .models import ArchivedExam, ArchivedMark, Class, ClassSection, Division, Exam, ExamResult, Mark, Student, Subject
+
+# Rows per DELETE; each batch commits on its own so other writers get in between
+PURGE_BATCH_SIZE = getattr(settings, 'PURGE_BATCH_SIZE', 5000)
+
+
+def purge(queryset, batch_size=PURGE_BATCH_SIZE):
+    """
+    Delete the rows of queryset in batches of plain SQL: no objects are
+    loaded, no signals sent and nothing cascaded. Returns the row count.
+    """
+    table = queryset.model._meta.db_table
+    pk = queryset.model._meta.pk.column
+    select, params = queryset.values('pk')[:batch_size].query.sql_with_params()
+    deleted = 0
+    while True:
+        with write_transaction(), connections[WRITE_DB].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({select})', params)
+            count = cursor.rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+def purge_exam(exam, batch_size=PURGE_BATCH_SIZE):
+    """Delete an exam with its marks and results; returns the number of marks deleted."""
+    marks = purge(Mark.objects.filter(exam=exam), batch_size)
+    purge(ExamResult.objects.filter(exam=exam), batch_size)
+    # Nothing left to cascade; the Exam delete signals refresh statistics and caches
+    exam.delete()
+    return marks
+
+
+def purge_class_section(section, batch_size=PURGE_BATCH_SIZE):
+    """Delete a section with its students, their marks and results; returns the number of marks deleted."""
+    marks = purge(Mark.objects.filter(student__class_section=section), batch_size)
+    purge(ExamResult.objects.filter(student__class_section=section), batch_size)
+    purge(ExamResult.objects.filter(class_section=section), batch_size)
+    # Statistics are recomputed from the base tables by the ClassSection delete signal
+    section.delete()
+    return marks
+
+
+def _archive_marks_sql():
+    tables = {model.__name__: model._meta.db_table for model in (
+        ArchivedMark, Mark, Student, ClassSection, Class, Division, Subject)}
+    return f"""
+        INSERT INTO {tables['ArchivedMark']}
+            (archived_exam_id, student_id, roll_number, student_name, class_section, subject, marks_obtained)
+        SELECT %s, m.student_id, s.roll_number, s.name, c.name || d.name, sub.name, m.marks_obtained
+        FROM {tables['Mark']} m
+        JOIN {tables['Student']} s ON s.id = m.student_id
+        JOIN {tables['ClassSection']} cs ON cs.id = s.class_section_id
+        JOIN {tables['Class']} c ON c.id = cs.school_class_id
+        JOIN {tables['Division']} d ON d.id = cs.division_id
+        JOIN {tables['Subject']} sub ON sub.id = m.subject_id
+        WHERE m.exam_id = %s
+    """
+
+
+def archive_exam(exam, batch_size=PURGE_BATCH_SIZE):
+    """
+    Copy an exam's marks into the archive tables, then purge it from the live
+    ones. Safe to run again after an interruption: marks already copied are
+    not copied twice.
+    """
+    with write_transaction():
+        archived, created = ArchivedExam.objects.get_or_create(
+            exam_id=exam.pk, defaults={'name': exam.name, 'date': exam.date})
+        if created:
+            with connections[WRITE_DB].cursor() as cursor:
+                cursor.execute(_archive_marks_sql(), [archived.pk, exam.pk])
+            archived.mark_count = ArchivedMark.objects.filter(archived_exam=archived).count()
+            archived.save(update_fields=['mark_count'])
+    purge_exam(exam, batch_size)
+    return archived
+
+
+def archive_exams(exams, batch_size=PURGE_BATCH_SIZE, progress=None):
+    """Archive each exam in turn; progress is called with every ArchivedExam."""
+    archived = []
+    for exam in exams:
+        archived.append(archive_exam(exam, batch_size))
+        if progress:
+            progress(archived[-1])
+    return archived
+
+
+def exams_before(day):
+    return Exam.objects.filter(date__lt=day).order_by('date', 'pk')
@@ -0,0 +1,155 @@
+"""
+Async versions of the read-heavy views, served instead of the ones in
+core.views when settings.ASYNC_VIEWS is on (SMS_ASYNC_VIEWS=1, under ASGI).
+Each view mirrors its sync twin; querysets are evaluated here, before render(),
+so templates never reach the database from inside the event loop.
+"""
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render, redirect
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from .decorators import resolve_user, student_required
+from .exports import filter_marks
+from .jobs import aenqueue
+from .models import ClassSection, Exam, Mark, Student, Subject, Teacher
+from .pagination import akeyset_paginate
+from .portal import aget_student_results
+from .search import student_filter
+from .snapshots import load_student_results, snapshot_path
+from .stats import adashboard_statistics, adashboard_version
+from .views import _results_etag
+
+
+async def _results_for(request):
+    # Snapshot files are small and immutable, so reading them inline is cheap
+    results = load_student_results(request.user.pk)
+    if results is None:
+        student_id = await Student.objects.filter(user=request.user).values_list('pk', flat=True).afirst()
+        if student_id is None:
+            return None
+        results = await aget_student_results(student_id)
+    return results
+
+
+@student_required
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_results_etag)
+async def home_view(request):
+    results = await _results_for(request)
+    if results is None:
+        return redirect('/login/')
+    return render(request, 'core/student_dashboard.html', {
+        'exam_results': results['exam_results'],
+        'results_summary': results['results_summary'],
+    })
+
+
+@student_required
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_results_etag)
+async def student_results(request):
+    results = await _results_for(request)
+    if results is None:
+        return HttpResponse("Student profile not found. Please contact the administrator.")
+    return render(request, 'core/student_results.html', {
+        'exam_results': results['exam_results'],
+        'standing': results.get('standing'),
+    })
+
+
+@student_required
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_results_etag)
+async def student_results_json(request):
+    path = snapshot_path(request.user.pk)
+    if path is not None:
+        try:
+            return HttpResponse(path.read_bytes(), content_type='application/json')
+        except FileNotFoundError:
+            pass
+    results = await _results_for(request)
+    if results is None:
+        return JsonResponse({'error': 'Student profile not found.'}, status=404)
+    return JsonResponse(results)
+
+
+@login_required(login_url='/admin/login/')
+@user_passes_test(lambda u: u.is_staff, login_url='/admin/login/')
+@resolve_user
+async def dashboard(request):
+    # Evaluated up front: the template cannot query from inside the event loop
+    context = {
+        'dashboard_version': await adashboard_version(),
+        'class_statistics': await adashboard_statistics(),
+        'total_exams': await Exam.objects.acount(),
+        'total_subjects': await Subject.objects.acount(),
+        'total_classdivs': await ClassSection.objects.acount(),
+        'recent_students': [s async for s in Student.objects.order_by('-id')[:5]],
+        'recent_exams': [e async for e in Exam.objects.order_by('-date')[:5]],
+        'recent_marks': [m async for m in Mark.objects.select_related('student', 'subject').order_by('-id')[:5]],
+        'upcoming_exams': [e async for e in Exam.objects.order_by('date')[:5]],
+    }
+    return render(request, 'core/admin_dashboard.html', context)
+
+
+@resolve_user
+async def class_section_list(request):
+    sections = [s async for s in ClassSection.objects.select_related('school_class', 'division', 'teacher')]
+    return render(request, 'core/section_list.html', {'sections': sections})
+
+
+@resolve_user
+async def student_list(request):
+    students = Student.objects.select_related('class_section__school_class', 'class_section__division')
+    query = request.GET.get('q', '')
+    if query:
+        students = students.filter(student_filter(query))
+    page = await akeyset_paginate(students, request)
+    return render(request, 'core/student_list.html', {'students': page, 'page': page, 'query': query})
+
+
+@resolve_user
+async def teacher_list(request):
+    page = await akeyset_paginate(Teacher.objects.all(), request)
+    return render(request, 'core/teacher_list.html', {'teachers': page, 'page': page})
+
+
+@resolve_user
+async def subject_list(request):
+    page = await akeyset_paginate(Subject.objects.all(), request)
+    return render(request, 'core/subject_list.html', {'subjects': page, 'page': page})
+
+
+@resolve_user
+async def exam_list(request):
+    page = await akeyset_paginate(Exam.objects.all(), request, ordering=('-date', '-pk'))
+    return render(request, 'core/exam_list.html', {'exams': page, 'page': page})
+
+
+@resolve_user
+async def mark_report(request):
+    student_query = request.GET.get('student', '')
+    marks = filter_marks(
+        Mark.objects.select_related('student', 'exam', 'subject'),
+        student=student_query, exam=request.GET.get('exam', ''), subject=request.GET.get('subject', ''),
+    )
+    if request.GET.get('export') == 'csv':
+        if not request.user.is_staff:
+            return redirect_to_login(request.get_full_path(), '/admin/login/')
+        job = await aenqueue('export_marks_csv', request.user, student=student_query,
+                             exam=request.GET.get('exam', ''), subject=request.GET.get('subject', ''))
+        return redirect('job_detail', pk=job.pk)
+    page = await akeyset_paginate(marks, request)
+    return render(request, 'core/mark_report.html', {
+        'marks': page,
+        'page': page,
+        'exams': [e async for e in Exam.objects.all()],
+        'subjects': [s async for s in Subject.objects.all()],
+        'student_query': student_query,
+    })
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+
+# Same lifetime as the session by default; entries are dropped on every user or student save
+USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', settings.SESSION_COOKIE_AGE)
+
+
+def _key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def _user(user_id):
+    # The student profile comes along, so request.user.student_profile needs no query
+    return User.objects.select_related('student_profile').filter(pk=user_id)
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose get_user(), run for every authenticated request, is
+    served from the cache instead of the auth_user table. Needs a cache every
+    process shares (core.apps refuses locmem), since saves invalidate entries
+    only in the cache they can reach.
+    """
+
+    def get_user(self, user_id):
+        user = cache.get(_key(user_id))
+        if user is None:
+            user = _user(user_id).first()
+            if user is None:
+                return None
+            cache.set(_key(user_id), user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        user = await cache.aget(_key(user_id))
+        if user is None:
+            user = await _user(user_id).afirst()
+            if user is None:
+                return None
+            await cache.aset(_key(user_id), user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+
+def invalidate_users(user_ids):
+    keys = [_key(user_id) for user_id in user_ids if user_id is not None]
+    cache.delete_many(keys)
+    # Again after commit, in case a concurrent request re-cached the old row meanwhile
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,32 @@
+"""
+Version counters kept in the cache. Callers put version(key) into their cache
+keys and bump(key) when the cached data changes, so stale entries are never
+read again and simply expire.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def version(key):
+    value = cache.get(key)
+    if value is None:
+        # Start from the clock so an evicted counter never revives old entries
+        cache.add(key, time.time_ns(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+async def aversion(key):
+    value = await cache.aget(key)
+    if value is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        value = await cache.aget(key)
+    return value
+
+
+def bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
@@ -0,0 +1,77 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections, transaction
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialised within one process
+    fcntl = None
+
+WRITE_DB = 'default'
+READ_DB = 'replica'
+
+# Set by core.middleware.ReadOnlyRoutingMiddleware for GET/HEAD requests
+read_only_request = ContextVar('read_only_request', default=False)
+
+
+class ReadWriteRouter:
+    """
+    Reads from safe-method requests go to the read-only connection; everything
+    else, including reads inside a write transaction, uses the single writer.
+    """
+
+    def db_for_read(self, model, **hints):
+        if read_only_request.get() and not connections[WRITE_DB].in_atomic_block:
+            return READ_DB
+        return WRITE_DB
+
+    def db_for_write(self, model, **hints):
+        return WRITE_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database file
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == WRITE_DB
+
+
+_local = threading.local()
+_process_lock = threading.Lock()
+
+
+@contextmanager
+def write_lock():
+    """
+    Queue behind other writers, across threads and processes, for as long as
+    it takes. SQLite's busy timeout gives up after a few seconds, which a long
+    import by another teacher can exceed. Re-entrant within a thread.
+    """
+    path = getattr(settings, 'SQLITE_WRITE_LOCK', None)
+    if not path or getattr(_local, 'held', False):
+        yield
+        return
+    _local.held = True
+    try:
+        if fcntl is None:
+            with _process_lock:
+                yield
+        else:
+            with open(path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    finally:
+        _local.held = False
+
+
+@contextmanager
+def write_transaction():
+    """transaction.atomic() on the writer, entered only once this process holds the write lock."""
+    with write_lock(), transaction.atomic(using=WRITE_DB):
+        yield
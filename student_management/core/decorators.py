@@ -1,23 +1,53 @@
 from django.http import HttpResponseForbidden
 from functools import wraps
 
-def student_required(view_func):
+from asgiref.sync import iscoroutinefunction
+
+
+def _student_denied(user):
+    if not user.is_authenticated:
+        from django.shortcuts import redirect
+        return redirect('/login/')
+    if user.is_staff or user.is_superuser:
+        return HttpResponseForbidden("Admins are not allowed to access student pages.")
+    return None
+
+
+def _admin_denied(user):
+    if not user.is_authenticated or not (user.is_staff or user.is_superuser):
+        from django.shortcuts import redirect
+        return redirect('/admin/login/')
+    return None
+
+
+def _checked(view_func, denied):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            # Load the user now: the lazy request.user would hit the database
+            # synchronously from inside the event loop later on
+            request.user = await request.auser()
+            return denied(request.user) or await view_func(request, *args, **kwargs)
+        return _wrapped_view
+
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            from django.shortcuts import redirect
-            return redirect('/login/')
-        if request.user.is_staff or request.user.is_superuser:
-            return HttpResponseForbidden("Admins are not allowed to access student pages.")
-        return view_func(request, *args, **kwargs)
+        return denied(request.user) or view_func(request, *args, **kwargs)
     return _wrapped_view
 
 
+def student_required(view_func):
+    return _checked(view_func, _student_denied)
+
+
 def admin_required(view_func):
+    return _checked(view_func, _admin_denied)
+
+
+def resolve_user(view_func):
+    """For async views: replace the lazy request.user so templates can read it."""
     @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated or not (request.user.is_staff or request.user.is_superuser):
-            from django.shortcuts import redirect
-            return redirect('/admin/login/')
-        return view_func(request, *args, **kwargs)
+    async def _wrapped_view(request, *args, **kwargs):
+        request.user = await request.auser()
+        return await view_func(request, *args, **kwargs)
     return _wrapped_view
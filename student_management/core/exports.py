@@ -0,0 +1,153 @@
+import csv
+import re
+import tempfile
+from itertools import groupby
+from operator import itemgetter
+
+from django.http import FileResponse, StreamingHttpResponse
+
+from .models import Subject
+from .search import student_filter
+
+# Rows are pulled from the database cursor in chunks of this size
+EXPORT_CHUNK_SIZE = 2000
+MARK_HEADER = ['Student', 'Exam', 'Subject', 'Marks']
+ARCHIVED_MARK_HEADER = ['Section', 'Roll', 'Student', 'Subject', 'Marks']
+# Characters Excel does not allow in a sheet name
+SHEET_TITLE_INVALID = re.compile(r'[\\/?*\[\]:]')
+
+
+class Echo:
+    """File-like object whose write() just hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def filter_marks(marks, student='', exam='', subject=''):
+    """The mark report's filters: a student search term, an exam id and a subject id."""
+    if student:
+        marks = marks.filter(student_filter(student, field='student_id'))
+    if exam:
+        marks = marks.filter(exam_id=exam)
+    if subject:
+        marks = marks.filter(subject_id=subject)
+    return marks
+
+
+def mark_rows(marks):
+    # Plain tuples straight from a server-side cursor, no Mark instances
+    return marks.order_by('pk').values_list(
+        'student__name', 'exam__name', 'subject__name', 'marks_obtained',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def iter_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow(row))
+        if len(batch) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def _csv_response(content, filename):
+    response = StreamingHttpResponse(content, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def stream_archived_marks_csv(marks, filename):
+    rows = marks.order_by('class_section', 'roll_number', 'pk').values_list(
+        'class_section', 'roll_number', 'student_name', 'subject', 'marks_obtained',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return _csv_response(iter_csv(ARCHIVED_MARK_HEADER, rows), filename)
+
+
+def gradebook_subjects(marks):
+    """(id, name) of every subject with a mark in `marks`: the gradebook's columns."""
+    return list(Subject.objects.filter(pk__in=marks.values('subject_id')).order_by('name').values_list('pk', 'name'))
+
+
+def gradebook_header(subjects):
+    return ['Section', 'Roll', 'Student', *(name for _, name in subjects), 'Total', 'Average']
+
+
+def _average(total, count):
+    return round(total / count, 2) if count else None
+
+
+def gradebook_rows(marks, subjects):
+    """
+    Pivot marks into one row per student (a column per subject, then total and
+    average), each section followed by a row of its averages. The marks come
+    from one cursor sorted by section and student, so only the current
+    student's and section's figures are held in memory.
+    """
+    column = {subject_id: index for index, (subject_id, _) in enumerate(subjects)}
+    rows = marks.order_by(
+        'student__class_section__school_class__name', 'student__class_section__division__name',
+        'student__class_section_id', 'student__roll_number', 'student_id',
+    ).values_list(
+        'student__class_section_id', 'student__class_section__school_class__name',
+        'student__class_section__division__name', 'student_id', 'student__roll_number', 'student__name',
+        'subject_id', 'marks_obtained',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for (_, class_name, division_name), section_rows in groupby(rows, key=itemgetter(0, 1, 2)):
+        section = f'{class_name}{division_name}'
+        sums = [0.0] * len(subjects)
+        counts = [0] * len(subjects)
+        students = totals = averages = 0
+        for (_, roll_number, name), student_rows in groupby(section_rows, key=itemgetter(3, 4, 5)):
+            cells = [None] * len(subjects)
+            for *_, subject_id, value in student_rows:
+                index = column[subject_id]
+                cells[index] = value
+                sums[index] += value
+                counts[index] += 1
+            values = [value for value in cells if value is not None]
+            total = round(sum(values), 2)
+            average = _average(total, len(values))
+            students += 1
+            totals += total
+            averages += average
+            yield [section, roll_number, name, *cells, total, average]
+        yield [section, '', 'Section average', *map(_average, sums, counts),
+               _average(totals, students), _average(averages, students)]
+
+
+def stream_gradebook_csv(marks, filename):
+    subjects = gradebook_subjects(marks)
+    return _csv_response(iter_csv(gradebook_header(subjects), gradebook_rows(marks, subjects)), filename)
+
+
+def sheet_title(title):
+    # Excel caps sheet names at 31 characters
+    return ' '.join(SHEET_TITLE_INVALID.sub(' ', title).split())[:31].strip() or 'Gradebook'
+
+
+def gradebook_xlsx(marks, filename, title='Gradebook'):
+    """
+    The gradebook as an .xlsx download. A write-only workbook spools rows to
+    disk as they are appended, so memory stays flat however many sections
+    are exported.
+    """
+    import openpyxl
+
+    subjects = gradebook_subjects(marks)
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title(title))
+    sheet.append(gradebook_header(subjects))
+    for row in gradebook_rows(marks, subjects):
+        sheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output, as_attachment=True, filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
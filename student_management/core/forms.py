@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from .models import Student, Exam, Subject, Division, Mark, ClassSection, Teacher, Class
+from .results import MAX_MARKS_PER_SUBJECT
 
 class UserForm(forms.ModelForm):
     password = forms.CharField(widget=forms.PasswordInput)
@@ -97,5 +98,7 @@ class StudentMarksEntryForm(forms.Form):
             self.fields[f'subject_{subject.pk}'] = forms.FloatField(
                 label=subject.name,
                 required=False,
+                min_value=0,
+                max_value=MAX_MARKS_PER_SUBJECT,
                 widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Enter marks'})
             )
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from .thumbnails import derivative_name
+
+# CR80 card and A4 sheet at 300 dpi, two columns by five rows
+DPI = 300
+CARD_SIZE = (1012, 638)
+PAGE_SIZE = (2480, 3508)
+COLUMNS, ROWS = 2, 5
+PHOTO_SIZE = (300, 380)
+CARD_VERSION = 1  # bump to re-render every cached card after a layout change
+
+
+def cache_dir():
+    return Path(settings.MEDIA_ROOT) / 'id_cards' / 'cache'
+
+
+def card_data(student, school_name):
+    """Plain, picklable description of one card; its hash is the cache key."""
+    photo = None
+    if student.profile_photo:
+        # The medium thumbnail is already cropped to size and much cheaper to decode
+        path = student.profile_photo.path
+        if student.photo_thumbnail:
+            thumbnail = default_storage.path(derivative_name(student.photo_thumbnail, 'medium', 'jpg'))
+            if os.path.exists(thumbnail):
+                path = thumbnail
+        if os.path.exists(path):
+            stat = os.stat(path)
+            photo = {'path': path, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+    data = {
+        'version': CARD_VERSION,
+        'student_id': student.pk,
+        'school': school_name,
+        'name': student.name,
+        'roll_number': student.roll_number,
+        'section': str(student.class_section),
+        'guardian_phone': student.guardian_phone or '',
+        'photo': photo,
+    }
+    digest = hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+    data['file'] = str(cache_dir() / f'{student.pk}-{digest}.png')
+    return data
+
+
+def _font(size):
+    for name in ('DejaVuSans-Bold.ttf', 'DejaVuSans.ttf', 'Arial.ttf'):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def render_card(data):
+    """Draw one card to its cache file. Runs in worker processes: no ORM access here."""
+    card = Image.new('RGB', CARD_SIZE, 'white')
+    draw = ImageDraw.Draw(card)
+    draw.rectangle([0, 0, CARD_SIZE[0], 120], fill='#0d6efd')
+    draw.text((40, 35), data['school'], fill='white', font=_font(52))
+    photo_box = (40, 170)
+    if data['photo']:
+        try:
+            with Image.open(data['photo']['path']) as photo:
+                photo.draft('RGB', PHOTO_SIZE)  # cheap JPEG downscale while decoding
+                photo = ImageOps.fit(ImageOps.exif_transpose(photo).convert('RGB'), PHOTO_SIZE)
+                card.paste(photo, photo_box)
+        except OSError:
+            pass
+    draw.rectangle([photo_box, (photo_box[0] + PHOTO_SIZE[0], photo_box[1] + PHOTO_SIZE[1])], outline='#adb5bd', width=3)
+    x = photo_box[0] + PHOTO_SIZE[0] + 50
+    draw.text((x, 190), data['name'], fill='black', font=_font(54))
+    lines = [f"Roll No: {data['roll_number']}", f"Section: {data['section']}"]
+    if data['guardian_phone']:
+        lines.append(f"Guardian: {data['guardian_phone']}")
+    for i, line in enumerate(lines):
+        draw.text((x, 290 + i * 70), line, fill='#343a40', font=_font(40))
+    draw.rectangle([0, 0, CARD_SIZE[0] - 1, CARD_SIZE[1] - 1], outline='#343a40', width=2)
+    path = Path(data['file'])
+    tmp = path.with_suffix('.tmp')
+    card.save(tmp, 'PNG', optimize=False)
+    os.replace(tmp, path)
+    # Drop cards rendered from older versions of this student's data
+    for old in path.parent.glob(f"{data['student_id']}-*.png"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return data['file']
+
+
+def render_cards(cards, workers=None, progress=None):
+    """
+    Render the cards that are not cached yet, in parallel. Returns how many
+    were rendered; progress is called with the number of cards ready so far.
+    """
+    cache_dir().mkdir(parents=True, exist_ok=True)
+    missing = [card for card in cards if not os.path.exists(card['file'])]
+    ready = len(cards) - len(missing)
+    if len(missing) < 8 or workers == 1:
+        for card in missing:
+            render_card(card)
+            ready += 1
+            if progress:
+                progress(ready)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for _ in pool.map(render_card, missing, chunksize=16):
+                ready += 1
+                if progress:
+                    progress(ready)
+    return len(missing)
+
+
+def write_sheets(cards, output, progress=None):
+    """
+    Lay the cached cards out on A4 pages, appending page by page to keep memory
+    flat; progress is called with the number of cards placed after each page.
+    """
+    per_page = COLUMNS * ROWS
+    margin_x = (PAGE_SIZE[0] - COLUMNS * CARD_SIZE[0]) // (COLUMNS + 1)
+    margin_y = (PAGE_SIZE[1] - ROWS * CARD_SIZE[1]) // (ROWS + 1)
+    if not cards:
+        Image.new('RGB', PAGE_SIZE, 'white').save(output, 'PDF', resolution=DPI)
+        return 1
+    pages = 0
+    for start in range(0, len(cards), per_page):
+        page = Image.new('RGB', PAGE_SIZE, 'white')
+        for i, card in enumerate(cards[start:start + per_page]):
+            column, row = i % COLUMNS, i // COLUMNS
+            with Image.open(card['file']) as image:
+                page.paste(image, (margin_x + column * (CARD_SIZE[0] + margin_x),
+                                   margin_y + row * (CARD_SIZE[1] + margin_y)))
+        page.save(output, 'PDF', resolution=DPI, append=pages > 0)
+        pages += 1
+        if progress:
+            progress(min(start + per_page, len(cards)))
+    return pages
+
+
+def build_id_card_pdf(students, output, workers=None, progress=None):
+    """
+    Render (or reuse cached) cards for `students` and write the PDF sheets to
+    `output`. progress, if given, is called with (cards done, message) while
+    cards are rendered and again while pages are written.
+    """
+    school_name = getattr(settings, 'SCHOOL_NAME', 'My School')
+    cards = [card_data(student, school_name) for student in students]
+    rendered = render_cards(cards, workers=workers, progress=progress and (
+        lambda done: progress(done, 'Rendering cards')))
+    pages = write_sheets(cards, output, progress=progress and (
+        lambda done: progress(done, 'Writing pages')))
+    return {'cards': len(cards), 'rendered': rendered, 'pages': pages}
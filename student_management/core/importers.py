@@ -0,0 +1,236 @@
+import csv
+import io
+import math
+import time
+from datetime import date
+
+from .database import write_transaction
+from .marks import upsert_marks, valid_mark
+from .models import Exam, Student, Subject
+from .results import MAX_MARKS_PER_SUBJECT
+
+IMPORT_CHUNK_SIZE = 5000
+
+
+def clean_cell(value):
+    """A spreadsheet cell as stripped text; empty cells (None, NaN) become ''."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.rejected = []  # (row number, reason)
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.seconds) if self.seconds else self.rows
+
+
+class MarkImporter:
+    """
+    Set-based marks import. Rows are dicts with Student, Exam, Subject and Marks
+    keys (optionally Roll and Date). Students are matched by roll number when a
+    row has a Roll, otherwise by name; unknown students are rejected
+    because a Student needs a user account and a class section. Missing exams
+    and subjects are created in bulk.
+    """
+
+    def __init__(self, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+        self.chunk_size = chunk_size
+        # Called with the number of rows read so far after every chunk
+        self.progress = progress
+        self.exams = {}
+        self.subjects = {}
+        self.students = {}
+
+    def run(self, rows):
+        # Row numbers follow the spreadsheet: header is row 1
+        return self.run_numbered(enumerate(rows, start=2))
+
+    def run_numbered(self, numbered_rows):
+        """Import (row number, row) pairs, e.g. from read_upload(); consumed one chunk at a time."""
+        result = ImportResult()
+        started = time.perf_counter()
+        self.exams = dict(Exam.objects.values_list('name', 'id'))
+        self.subjects = dict(Subject.objects.values_list('name', 'id'))
+        chunk = []
+        for number, row in numbered_rows:
+            chunk.append((number, row))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk, result)
+                chunk = []
+                if self.progress:
+                    self.progress(result.rows)
+        if chunk:
+            self._import_chunk(chunk, result)
+        result.rejected.sort()
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def _import_chunk(self, chunk, result):
+        parsed = []
+        for number, row in chunk:
+            result.rows += 1
+            roll = clean_cell(row.get('Roll'))
+            # Keys are (field, value), so a name is never looked up as a roll number
+            student = ('roll_number', roll) if roll else ('name', clean_cell(row.get('Student')))
+            exam = clean_cell(row.get('Exam'))
+            subject = clean_cell(row.get('Subject'))
+            if not (student[1] and exam and subject):
+                result.rejected.append((number, 'Missing student, exam or subject.'))
+                continue
+            try:
+                marks = float(row.get('Marks'))
+            except (TypeError, ValueError, OverflowError):
+                marks = None
+            if not valid_mark(marks):
+                result.rejected.append((number, f'Marks must be a number from 0 to {MAX_MARKS_PER_SUBJECT}.'))
+                continue
+            parsed.append((number, student, exam, subject, marks, row.get('Date')))
+
+        with write_transaction():
+            self._resolve_students({p[1] for p in parsed})
+            self._create_missing(parsed)
+            upserts = {}
+            for number, student, exam, subject, marks, _ in parsed:
+                student_id = self.students.get(student)
+                if student_id is None:
+                    result.rejected.append((number, f'Unknown student "{student[1]}".'))
+                    continue
+                if student_id == 0:
+                    result.rejected.append((number, f'Student "{student[1]}" is ambiguous.'))
+                    continue
+                # Last row wins when the sheet repeats a mark
+                upserts[(student_id, self.exams[exam], self.subjects[subject])] = marks
+            result.imported += upsert_marks(key + (value,) for key, value in upserts.items())
+
+    def _resolve_students(self, keys):
+        missing = keys.difference(self.students)
+        if not missing:
+            return
+        for field in ('roll_number', 'name'):
+            values = {value for key_field, value in missing if key_field == field}
+            if not values:
+                continue
+            for pk, value in Student.objects.filter(**{f'{field}__in': values}).values_list('id', field):
+                # 0 marks a key shared by more than one student
+                key = (field, value)
+                self.students[key] = 0 if key in self.students else pk
+        self.students.update((key, None) for key in missing if key not in self.students)
+
+    def _create_missing(self, parsed):
+        new_exams = {}
+        new_subjects = set()
+        for _, _, exam, subject, _, exam_date in parsed:
+            if exam not in self.exams:
+                new_exams.setdefault(exam, exam_date)
+            if subject not in self.subjects:
+                new_subjects.add(subject)
+        if new_exams:
+            Exam.objects.bulk_create([
+                Exam(name=name, date=_exam_date(exam_date)) for name, exam_date in new_exams.items()
+            ])
+            self.exams.update(Exam.objects.filter(name__in=new_exams).values_list('name', 'id'))
+        if new_subjects:
+            Subject.objects.bulk_create([Subject(name=name) for name in new_subjects])
+            self.subjects.update(Subject.objects.filter(name__in=new_subjects).values_list('name', 'id'))
+
+
+UPLOAD_EXTENSIONS = ('.xlsx', '.xlsm', '.csv')
+
+
+class UnreadableUpload(ValueError):
+    pass
+
+
+def read_upload(upload, name=None):
+    """
+    Stream (row number, row dict) pairs from an uploaded .xlsx or .csv file,
+    keyed by the header row and skipping blank rows. Nothing beyond the
+    current row (plus the workbook's shared strings) is held in memory.
+    """
+    name = (name or getattr(upload, 'name', '') or '').lower()
+    if name.endswith('.csv'):
+        return _csv_rows(upload)
+    if name.endswith(UPLOAD_EXTENSIONS):
+        return _xlsx_rows(_open_workbook(upload))
+    raise UnreadableUpload('Upload an .xlsx workbook or a .csv file.')
+
+
+def _header(cells):
+    return [clean_cell(cell) for cell in cells]
+
+
+def _numbered(header, rows):
+    for number, cells in enumerate(rows, start=2):
+        if any(cell not in (None, '') for cell in cells):
+            yield number, dict(zip(header, cells))
+
+
+def _open_workbook(upload):
+    # Imported here: only imports need openpyxl, and it is slow to load
+    import openpyxl
+    from openpyxl.utils.exceptions import InvalidFileException
+    from zipfile import BadZipFile
+
+    try:
+        # read_only parses the sheet XML lazily, row by row
+        return openpyxl.load_workbook(upload, read_only=True, data_only=True)
+    except (InvalidFileException, BadZipFile, KeyError, OSError):
+        raise UnreadableUpload('The file is not a readable .xlsx workbook.')
+
+
+def _xlsx_rows(workbook):
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _header(next(rows, ()))
+        yield from _numbered(header, rows)
+    finally:
+        workbook.close()
+
+
+def _csv_rows(upload):
+    text = io.TextIOWrapper(getattr(upload, 'file', upload), encoding='utf-8-sig', newline='')
+    try:
+        rows = csv.reader(text)
+        header = _header(next(rows, ()))
+        yield from _numbered(header, rows)
+    except UnicodeDecodeError:
+        raise UnreadableUpload('The CSV file is not UTF-8 encoded; rows before the error may already be imported.')
+    except csv.Error as exc:
+        raise UnreadableUpload(f'The CSV file could not be parsed ({exc}); rows before the error may already be imported.')
+    finally:
+        # Leave the upload open for Django to clean up
+        text.detach()
+
+
+def cell_date(value):
+    """
+    A date from a spreadsheet cell (a date, datetime or YYYY-MM-DD text), None
+    for an empty cell. Raises ValueError for anything else.
+    """
+    if value is None or value != value or (isinstance(value, str) and not value.strip()):  # NaN / NaT from empty cells
+        return None
+    if hasattr(value, 'date') and callable(value.date):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        raise ValueError(f'"{value}" is not a YYYY-MM-DD date.')
+
+
+def _exam_date(value):
+    # A new exam without a usable date is dated today rather than rejected
+    try:
+        return cell_date(value) or date.today()
+    except ValueError:
+        return date.today()
@@ -0,0 +1,300 @@
+"""
+Database-backed background jobs. Views call enqueue(); `manage.py run_jobs`
+claims queued rows and runs them in a process pool, so imports, exports and
+PDF sheets never hold a web worker. Task functions take the Job and its params,
+report progress through job_progress() and write downloads under result_path().
+"""
+import csv
+import logging
+import os
+import time
+import traceback
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_ROOT = Path(getattr(settings, 'JOB_ROOT', settings.BASE_DIR / 'jobs'))
+# A running job whose heartbeat is older than this is assumed lost with its worker
+JOB_STALE_AFTER = timedelta(seconds=getattr(settings, 'JOB_STALE_AFTER', 60 * 60))
+JOB_RESULT_TTL = timedelta(days=getattr(settings, 'JOB_RESULT_TTL_DAYS', 7))
+# Onboarding credentials sheets hold plaintext passwords, so they go much sooner than other downloads
+CREDENTIALS_TTL = timedelta(minutes=getattr(settings, 'JOB_CREDENTIALS_TTL_MINUTES', 60))
+# Progress is written at most this often (seconds), to keep the writer free
+PROGRESS_INTERVAL = 1.0
+
+_tasks = {}
+
+
+class JobFailed(Exception):
+    """Raised by tasks for expected failures; the message is shown to the user as is."""
+
+
+def worker_count():
+    return getattr(settings, 'JOB_WORKERS', None) or os.cpu_count() or 1
+
+
+def task(name):
+    """Register a function(job, **params) as the handler for jobs of this kind."""
+    def register(func):
+        _tasks[name] = func
+        return func
+    return register
+
+
+def save_upload(upload):
+    """Copy an uploaded file under JOB_ROOT so the worker can read it after the request ends."""
+    directory = JOB_ROOT / 'uploads'
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{uuid.uuid4().hex}{Path(upload.name).suffix.lower()}'
+    with open(path, 'wb') as output:
+        for chunk in upload.chunks():
+            output.write(chunk)
+    return str(path.relative_to(JOB_ROOT))
+
+
+def enqueue(kind, user=None, **params):
+    if kind not in _tasks:
+        raise ValueError(f'Unknown job kind "{kind}".')
+    job = Job.objects.create(kind=kind, params=params, created_by=user)
+    if getattr(settings, 'JOBS_INLINE', False):
+        # No worker in this deployment (development, tests): run it now
+        if claim(job.pk):
+            run_job(job.pk)
+        job.refresh_from_db()
+    return job
+
+
+async def aenqueue(kind, user=None, **params):
+    return await sync_to_async(enqueue)(kind, user, **params)
+
+
+def claim(job_id):
+    """Mark a queued job running; False when another worker got there first."""
+    now = timezone.now()
+    return bool(Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+        status=Job.RUNNING, started_at=now, updated_at=now))
+
+
+def claim_next():
+    for job_id in Job.objects.filter(status=Job.QUEUED).order_by('pk').values_list('pk', flat=True)[:10]:
+        if claim(job_id):
+            return job_id
+    return None
+
+
+def job_progress(job, progress, total=None, message=None, force=False):
+    now = time.monotonic()
+    if not force and now - getattr(job, '_progress_written', 0) < PROGRESS_INTERVAL:
+        return
+    job._progress_written = now
+    job.progress = progress
+    fields = {'progress': progress, 'updated_at': timezone.now()}
+    if total is not None:
+        job.total = fields['total'] = total
+    if message is not None:
+        job.message = fields['message'] = message[:255]
+    Job.objects.filter(pk=job.pk).update(**fields)
+
+
+def result_path(job, filename):
+    """Where a job writes its download; recorded on the job when it finishes."""
+    directory = JOB_ROOT / 'results' / str(job.pk)
+    directory.mkdir(parents=True, exist_ok=True)
+    job.result_file = str((directory / filename).relative_to(JOB_ROOT))
+    return directory / filename
+
+
+def result_file_path(job):
+    return JOB_ROOT / job.result_file if job.result_file else None
+
+
+def run_job(job_id):
+    """Run one claimed job to completion, in the current process."""
+    job = Job.objects.get(pk=job_id)
+    try:
+        result = _tasks[job.kind](job, **job.params)
+    except JobFailed as exc:
+        mark_failed(job.pk, str(exc))
+        return Job.FAILED
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.kind)
+        mark_failed(job.pk, traceback.format_exc(limit=20))
+        return Job.FAILED
+    finally:
+        upload = job.params.get('upload')
+        if upload:
+            (JOB_ROOT / upload).unlink(missing_ok=True)
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.DONE, result=result or {}, result_file=job.result_file, message='',
+        progress=job.total or job.progress, total=job.total, finished_at=timezone.now(), updated_at=timezone.now())
+    return Job.DONE
+
+
+def run_job_in_worker(job_id):
+    """run_job() for pool processes, which keep their connection between jobs."""
+    close_old_connections()
+    try:
+        return run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def mark_failed(job_id, error):
+    now = timezone.now()
+    Job.objects.filter(pk=job_id).update(status=Job.FAILED, error=error, finished_at=now, updated_at=now)
+
+
+def requeue(job_id):
+    Job.objects.filter(pk=job_id, status=Job.RUNNING).update(status=Job.QUEUED, progress=0)
+
+
+def requeue_stale():
+    """Put jobs whose worker died (no heartbeat for JOB_STALE_AFTER) back in the queue."""
+    return Job.objects.filter(status=Job.RUNNING, updated_at__lt=timezone.now() - JOB_STALE_AFTER).update(
+        status=Job.QUEUED, progress=0, message='Requeued after the worker stopped.')
+
+
+def _remove_result_file(job):
+    path = result_file_path(job)
+    path.unlink(missing_ok=True)
+    try:
+        path.parent.rmdir()
+    except OSError:
+        pass
+
+
+def credentials_expired(job):
+    return job.kind == 'onboard_students' and job.finished_at < timezone.now() - CREDENTIALS_TTL
+
+
+def purge_credentials():
+    """Delete onboarding credentials sheets older than CREDENTIALS_TTL; the jobs stay listed."""
+    expired = Job.objects.filter(kind='onboard_students', finished_at__lt=timezone.now() - CREDENTIALS_TTL).exclude(
+        result_file='')
+    for job in expired:
+        _remove_result_file(job)
+    return expired.update(result_file='')
+
+
+def purge_expired():
+    """Delete finished jobs older than JOB_RESULT_TTL together with their files."""
+    purge_credentials()
+    expired = Job.objects.filter(finished_at__lt=timezone.now() - JOB_RESULT_TTL)
+    for job in expired.exclude(result_file=''):
+        _remove_result_file(job)
+    return expired.delete()[0]
+
+
+# --- Tasks ---
+
+@task('import_marks')
+def import_marks(job, upload, upload_name):
+    from .importers import MarkImporter, UnreadableUpload, read_upload
+
+    with open(JOB_ROOT / upload, 'rb') as workbook:
+        importer = MarkImporter(progress=lambda rows: job_progress(job, rows, message=f'{rows} rows read'))
+        try:
+            result = importer.run_numbered(read_upload(workbook, name=upload_name))
+        except UnreadableUpload as exc:
+            raise JobFailed(str(exc))
+    job.total = result.rows
+    return {
+        'rows': result.rows,
+        'imported': result.imported,
+        'seconds': round(result.seconds, 1),
+        'rows_per_second': result.rows_per_second,
+        'rejected_count': len(result.rejected),
+        # Enough to fix a sheet; the count says how many there were
+        'rejected': result.rejected[:500],
+    }
+
+
+@task('export_marks_csv')
+def export_marks_csv(job, student='', exam='', subject=''):
+    from .exports import MARK_HEADER, filter_marks, mark_rows
+    from .models import Mark
+
+    marks = filter_marks(Mark.objects.all(), student=student, exam=exam, subject=subject)
+    total = marks.count()
+    job_progress(job, 0, total=total, force=True)
+    with open(result_path(job, 'mark_report.csv'), 'w', newline='') as output:
+        writer = csv.writer(output)
+        writer.writerow(MARK_HEADER)
+        for number, row in enumerate(mark_rows(marks), start=1):
+            writer.writerow(row)
+            if number % 5000 == 0:
+                job_progress(job, number)
+    job.total = total
+    return {'rows': total}
+
+
+@task('id_card_pdf')
+def id_card_pdf(job, class_section='all'):
+    from .idcards import build_id_card_pdf
+    from .models import Student
+
+    students = Student.objects.select_related('class_section__school_class', 'class_section__division').order_by(
+        'class_section', 'roll_number', 'pk')
+    if class_section != 'all':
+        students = students.filter(class_section_id=class_section)
+    job_progress(job, 0, total=students.count(), message='Rendering cards', force=True)
+    # Each callback also refreshes updated_at, so requeue_stale() leaves a long render alone
+    summary = build_id_card_pdf(students, result_path(job, f'id_cards_{class_section}.pdf'),
+                                progress=lambda done, message: job_progress(job, done, message=message))
+    job.total = summary['cards']
+    return summary
+
+
+@task('onboard_students')
+def onboard_students(job, upload, upload_name, skip_invalid=False):
+    from .importers import UnreadableUpload, read_upload
+    from .onboarding import StudentOnboarding
+
+    onboarding = StudentOnboarding(
+        skip_invalid=skip_invalid,
+        progress=lambda created, total: job_progress(job, created, total=total, message=f'{created} students created'))
+    job_progress(job, 0, message='Checking rows', force=True)
+    with open(JOB_ROOT / upload, 'rb') as workbook, \
+            open(result_path(job, 'credentials.csv'), 'w', newline='') as credentials:
+        try:
+            result = onboarding.run_numbered(read_upload(workbook, name=upload_name), credentials=credentials)
+        except UnreadableUpload as exc:
+            raise JobFailed(str(exc))
+    if not result.created:
+        # Nothing to hand out
+        result_file_path(job).unlink(missing_ok=True)
+        job.result_file = ''
+    job.total = result.created
+    return {
+        'rows': result.rows,
+        'created': result.created,
+        'seconds': round(result.seconds, 1),
+        'rejected_count': len(result.rejected),
+        'rejected': result.rejected[:500],
+    }
+
+
+@task('archive_exams')
+def archive_exams(job, exam_ids=None, before=None):
+    from datetime import date
+
+    from . import archive
+    from .models import Exam
+
+    exams = archive.exams_before(date.fromisoformat(before)) if before else Exam.objects.filter(
+        pk__in=exam_ids or []).order_by('date', 'pk')
+    total = exams.count()
+    job_progress(job, 0, total=total, force=True)
+    archived = archive.archive_exams(exams, progress=lambda done: job_progress(
+        job, job.progress + 1, message=f'Archived {done.name} ({done.mark_count} marks)', force=True))
+    job.total = total
+    return {'exams': len(archived), 'marks': sum(exam.mark_count for exam in archived)}
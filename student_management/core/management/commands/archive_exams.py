@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import PURGE_BATCH_SIZE, archive_exams, exams_before, purge_exam
+from core.models import Exam
+
+
+class Command(BaseCommand):
+    help = (
+        'Move past exams and their marks into the read-only archive tables, or with --purge '
+        'delete them outright, using batched SQL instead of loading every mark.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat, help='Every exam dated before this day (YYYY-MM-DD).')
+        parser.add_argument('--exam', type=int, action='append', default=[], help='Exam id; may be repeated.')
+        parser.add_argument('--purge', action='store_true', help='Delete the exams without archiving them.')
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE, help='Rows per DELETE statement.')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            exams = exams_before(options['before'])
+        elif options['exam']:
+            exams = Exam.objects.filter(pk__in=options['exam']).order_by('date', 'pk')
+        else:
+            raise CommandError('Give --before or at least one --exam.')
+        if options['purge']:
+            for exam in exams:
+                marks = purge_exam(exam, options['batch_size'])
+                self.stdout.write(f'Deleted {exam.name} ({exam.date}) with {marks} marks.')
+            return
+        archived = archive_exams(exams, options['batch_size'], progress=lambda exam: self.stdout.write(
+            f'Archived {exam.name} ({exam.date}) with {exam.mark_count} marks.'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {len(archived)} exams, {sum(exam.mark_count for exam in archived)} marks.'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Student
+from core.thumbnails import update_student_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Create resized WebP/JPEG copies of student profile photos that do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild thumbnails for every photo.')
+
+    def handle(self, *args, **options):
+        students = Student.objects.exclude(profile_photo='').exclude(profile_photo__isnull=True)
+        if not options['force']:
+            students = students.filter(photo_thumbnail__isnull=True)
+        built = failed = 0
+        for student in students.only('id', 'profile_photo', 'photo_thumbnail').iterator(chunk_size=500):
+            try:
+                update_student_thumbnails(student, student.photo_thumbnail)
+                built += 1
+            except OSError as exc:
+                failed += 1
+                self.stderr.write(f'Student {student.pk}: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'Built thumbnails for {built} students ({failed} failed).'))
@@ -0,0 +1,42 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Exam, Mark, Student
+
+# SQLite: "SCAN core_mark" without USING ... INDEX; PostgreSQL: "Seq Scan on core_mark"
+FULL_SCAN = re.compile(r'\bSCAN (\w+)(?!.*\bINDEX\b)|Seq Scan on (\w+)')
+
+
+def hot_queries():
+    # Query shapes used by core.views, the importer and the marks entry pages
+    return {
+        'marks for student': Mark.objects.filter(student_id=1),
+        'marks for student and exam': Mark.objects.filter(student_id=1, exam_id=1),
+        'mark upsert lookup': Mark.objects.filter(student_id=1, exam_id=1, subject_id=1),
+        'marks for exam': Mark.objects.filter(exam_id=1),
+        'marks for exam and subject': Mark.objects.filter(exam_id=1, subject_id=1),
+        'students by roll number': Student.objects.filter(roll_number__in=['1', '2']),
+        'students by name': Student.objects.filter(name__in=['A', 'B']),
+        'students in section': Student.objects.filter(class_section_id=1),
+        'latest exam': Exam.objects.order_by('-date')[:1],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the hot queries and fail if any of them scans a whole table.'
+
+    def handle(self, *args, **options):
+        failures = []
+        for label, queryset in hot_queries().items():
+            plan = queryset.explain()
+            scans = [table for match in FULL_SCAN.finditer(plan) for table in match.groups() if table]
+            if scans:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'FULL SCAN  {label}: {", ".join(scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'indexed    {label}'))
+            if options['verbosity'] > 1:
+                self.stdout.write(f'    {plan}')
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries do not use an index.')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Exam
+from core.results import compute_exam_results
+
+
+class Command(BaseCommand):
+    help = 'Compute totals, percentages, ranks, percentiles and grades for exams.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_ids', nargs='*', type=int, help='Exam ids (default: every exam).')
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.order_by('date', 'pk')
+        if options['exam_ids']:
+            exams = exams.filter(pk__in=options['exam_ids'])
+            if len(exams) != len(set(options['exam_ids'])):
+                raise CommandError('Unknown exam id.')
+        for exam in exams:
+            count, seconds = compute_exam_results(exam)
+            self.stdout.write(f'{exam.name}: {count} students in {seconds:.2f}s')
@@ -1,25 +1,28 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from core.models import SchoolClass, Subject, Student, Exam, ClassDivision, Division
+from core.models import Class, ClassSection, Division, Exam, Student, Subject
 
 class Command(BaseCommand):
-    help = 'Create demo data: class, subjects, student, exam, and link them.'
+    help = 'Create demo data: class, subjects, student, exam, and link them. See generate_dataset for larger data.'
 
     def handle(self, *args, **kwargs):
-        # Create class
-        school_class, _ = SchoolClass.objects.get_or_create(name="10th")
-        # Create subjects
-        math, _ = Subject.objects.get_or_create(name="Math", student_class=school_class)
-        science, _ = Subject.objects.get_or_create(name="Science", student_class=school_class)
-        english, _ = Subject.objects.get_or_create(name="English", student_class=school_class)
-        # Link subjects to class (many-to-many)
-        school_class.subjects.set([math, science, english])
-        # Create division
+        # Create class and division
+        school_class, _ = Class.objects.get_or_create(name="10")
         division, _ = Division.objects.get_or_create(name="A")
-        class_div, _ = ClassDivision.objects.get_or_create(student_class=school_class, division=division)
+        section = ClassSection.objects.filter(school_class=school_class, division=division).first()
+        if section is None:
+            section = ClassSection.objects.create(school_class=school_class, division=division)
+        # Create subjects and link them to the section
+        math, _ = Subject.objects.get_or_create(name="Math")
+        science, _ = Subject.objects.get_or_create(name="Science")
+        english, _ = Subject.objects.get_or_create(name="English")
+        section.subjects.add(math, science, english)
         # Create user and student
-        user, _ = User.objects.get_or_create(username="student1", defaults={"first_name": "Test", "last_name": "Student"})
-        student, _ = Student.objects.get_or_create(user=user, roll_number="1", class_division=class_div, id_number="S1001")
+        user, created = User.objects.get_or_create(username="student1", defaults={"first_name": "Test", "last_name": "Student"})
+        if created:
+            user.set_password("student123")
+            user.save()
+        Student.objects.get_or_create(user=user, defaults={"name": "Test Student", "roll_number": "1", "class_section": section})
         # Create exam
-        exam, _ = Exam.objects.get_or_create(name="Midterm", academic_year="2024-2025", date="2025-06-01")
-        self.stdout.write(self.style.SUCCESS("Demo data created! You can now use the bulk marks entry form in the admin."))
+        Exam.objects.get_or_create(name="Midterm", defaults={"date": "2025-06-01"})
+        self.stdout.write(self.style.SUCCESS("Demo data created! Log in as student1 / student123 or use the marks entry pages."))
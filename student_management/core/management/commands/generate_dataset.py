@@ -0,0 +1,135 @@
+import random
+import string
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Class, ClassSection, Division, Exam, Mark, Student, Subject, Teacher
+from core.portal import invalidate_all_students
+from core.stats import refresh_classes
+
+FIRST_NAMES = ['Aarav', 'Aisha', 'Arjun', 'Diya', 'Fatima', 'Ishaan', 'Kabir', 'Meera', 'Nikhil', 'Priya',
+               'Rahul', 'Sana', 'Tara', 'Vivaan', 'Zara', 'Omar', 'Leela', 'Dev', 'Anaya', 'Yusuf']
+LAST_NAMES = ['Khan', 'Sharma', 'Patel', 'Iyer', 'Reddy', 'Nair', 'Das', 'Gupta', 'Ahmed', 'Menon',
+              'Singh', 'Rao', 'Joshi', 'Ali', 'Verma', 'Bose', 'Pillai', 'Shah', 'Kapoor', 'Mehta']
+SUBJECT_NAMES = ['Mathematics', 'Science', 'English', 'Social Studies', 'Hindi', 'Computer Science',
+                 'Physics', 'Chemistry', 'Biology', 'Economics', 'History', 'Geography']
+CLASS_NAMES = [str(n) for n in range(1, 13)]
+
+
+def division_name(index):
+    letters = string.ascii_uppercase
+    return letters[index] if index < len(letters) else letters[index // len(letters) - 1] + letters[index % len(letters)]
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic school (sections, students, exams, marks) with bulk inserts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sections', type=int, default=20)
+        parser.add_argument('--students', type=int, default=2000, help='Total students, spread over the sections.')
+        parser.add_argument('--exams', type=int, default=5)
+        parser.add_argument('--subjects-per-section', type=int, default=5)
+        parser.add_argument('--prefix', default='gen', help='Prefix for usernames, roll numbers and exam names.')
+        parser.add_argument('--password', default='student123', help='Password for every generated student.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'Users starting with "{prefix}" already exist; pick another --prefix.')
+        if options['subjects_per_section'] > len(SUBJECT_NAMES):
+            raise CommandError(f'At most {len(SUBJECT_NAMES)} subjects per section.')
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+        with transaction.atomic():
+            sections = self.create_sections(options['sections'], options['subjects_per_section'], prefix)
+            students = self.create_students(options['students'], sections, prefix, options['password'])
+            exams = self.create_exams(options['exams'], prefix)
+            marks = self.create_marks(students, exams)
+        # Bulk inserts bypass the signals that keep these up to date
+        refresh_classes()
+        invalidate_all_students()
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(sections)} sections, {len(students)} students, {len(exams)} exams '
+            f'and {marks} marks in {time.perf_counter() - started:.1f}s.'
+        ))
+
+    def create_sections(self, count, subjects_per_section, prefix):
+        classes = [Class.objects.get_or_create(name=name)[0] for name in CLASS_NAMES]
+        divisions = [
+            Division.objects.get_or_create(name=division_name(i))[0]
+            for i in range((count + len(classes) - 1) // len(classes))
+        ]
+        subjects = [Subject.objects.get_or_create(name=name)[0] for name in SUBJECT_NAMES]
+        teachers = Teacher.objects.bulk_create([
+            Teacher(name=f'{prefix} Teacher {i}', email=f'{prefix}.teacher{i}@example.com') for i in range(count)
+        ])
+        sections = ClassSection.objects.bulk_create([
+            ClassSection(school_class=classes[i % len(classes)], division=divisions[i // len(classes)], teacher=teachers[i])
+            for i in range(count)
+        ])
+        ClassSection.subjects.through.objects.bulk_create([
+            ClassSection.subjects.through(classsection_id=section.pk, subject_id=subject.pk)
+            for section in sections
+            for subject in self.random.sample(subjects, subjects_per_section)
+        ])
+        return sections
+
+    def create_students(self, count, sections, prefix, password):
+        # Hashing is deliberately slow; one hash shared by every account keeps this fast
+        password = make_password(password)
+        width = len(str(count))
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}{n:0{width}d}', password=password) for n in range(count)
+        ], batch_size=self.batch_size)
+        students = Student.objects.bulk_create([
+            Student(
+                user=user,
+                name=f'{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)}',
+                roll_number=f'{prefix}{n:0{width}d}',
+                class_section=sections[n % len(sections)],
+                guardian_name=f'{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)}',
+                guardian_phone=f'9{self.random.randrange(10 ** 9):09d}',
+            )
+            for n, user in enumerate(users)
+        ], batch_size=self.batch_size)
+        return students
+
+    def create_exams(self, count, prefix):
+        start = date.today() - timedelta(days=30 * count)
+        return Exam.objects.bulk_create([
+            Exam(name=f'{prefix} Exam {i + 1}', date=start + timedelta(days=30 * i)) for i in range(count)
+        ])
+
+    def create_marks(self, students, exams):
+        section_subjects = {}
+        for section_id, subject_id in ClassSection.subjects.through.objects.filter(
+                classsection_id__in={s.class_section_id for s in students}).values_list('classsection_id', 'subject_id'):
+            section_subjects.setdefault(section_id, []).append(subject_id)
+        # Plain executemany: model instances for millions of rows would dominate the run time
+        table = connection.ops.quote_name(Mark._meta.db_table)
+        sql = f'INSERT INTO {table} (student_id, exam_id, subject_id, marks_obtained) VALUES (%s, %s, %s, %s)'
+        gauss = self.random.gauss
+        batch = []
+        total = 0
+        with connection.cursor() as cursor:
+            for student in students:
+                ability = gauss(65, 12)
+                for exam in exams:
+                    for subject_id in section_subjects.get(student.class_section_id, []):
+                        batch.append((student.pk, exam.pk, subject_id, round(min(100, max(0, gauss(ability, 10))))))
+                if len(batch) >= self.batch_size * 10:
+                    cursor.executemany(sql, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+                total += len(batch)
+        return total
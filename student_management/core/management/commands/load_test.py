@@ -0,0 +1,122 @@
+import http.client
+import json
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Send concurrent GET requests to a running server and report throughput and latency. '
+        'Run it once against the WSGI deployment (e.g. gunicorn student_management.wsgi) and once '
+        'against ASGI (e.g. uvicorn student_management.asgi:application) with the same options '
+        'and different --label values to compare them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Full URLs, requested round-robin.')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--user', help='Username to send requests as (a session is created for it).')
+        parser.add_argument('--label', default='', help='Name of the deployment under test, e.g. wsgi or asgi.')
+        parser.add_argument('--output', help='Append the result as one JSON line to this file.')
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        for url in options['urls']:
+            if urlsplit(url).scheme not in ('http', 'https'):
+                raise CommandError(f'Not an http(s) URL: {url}')
+        self.urls = options['urls']
+        self.timeout = options['timeout']
+        self.cookie = self.session_cookie(options['user']) if options['user'] else None
+        total = options['requests']
+        self.next_request = iter(range(total))
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = Counter()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(lambda _: self.worker(), range(options['concurrency'])))
+        seconds = time.perf_counter() - started
+
+        latencies = sorted(self.latencies)
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        result = {
+            'label': options['label'],
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'urls': self.urls,
+            'concurrency': options['concurrency'],
+            'requests': total,
+            'seconds': round(seconds, 3),
+            'requests_per_second': round(total / seconds, 1),
+            'p50': round(quantiles[49], 4),
+            'p95': round(quantiles[94], 4),
+            'p99': round(quantiles[98], 4),
+            'max': round(latencies[-1], 4) if latencies else None,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items(), key=str)},
+        }
+        self.stdout.write(
+            f"{result['label'] or 'run'}: {result['requests_per_second']} req/s, "
+            f"p50 {result['p50'] * 1000:.1f}ms, p95 {result['p95'] * 1000:.1f}ms, "
+            f"p99 {result['p99'] * 1000:.1f}ms, statuses {result['statuses']}"
+        )
+        if options['output']:
+            with open(options['output'], 'a') as output:
+                output.write(json.dumps(result) + '\n')
+
+    def session_cookie(self, username):
+        # The same session Client.force_login() would create
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'Unknown user "{username}".')
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+    def worker(self):
+        connections = {}
+        headers = {'Cookie': self.cookie} if self.cookie else {}
+        while True:
+            with self.lock:
+                number = next(self.next_request, None)
+            if number is None:
+                break
+            url = urlsplit(self.urls[number % len(self.urls)])
+            connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+            # Keep-alive connection per host, like a browser
+            if url.netloc not in connections:
+                connections[url.netloc] = connection_class(url.netloc, timeout=self.timeout)
+            connection = connections[url.netloc]
+            path = url.path + (f'?{url.query}' if url.query else '')
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                status = 'error'
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.latencies.append(elapsed)
+                self.statuses[status] += 1
+        for connection in connections.values():
+            connection.close()
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import UnreadableUpload, read_upload
+from core.onboarding import StudentOnboarding
+
+
+class Command(BaseCommand):
+    help = (
+        'Create student accounts from an .xlsx or .csv sheet (Name, Roll, Section, ...) and write '
+        'their usernames and passwords to a credentials CSV.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='The .xlsx workbook or .csv file to read.')
+        parser.add_argument('--credentials', default='credentials.csv', help='Where to write the credentials CSV.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Password hashing processes (default: settings.ONBOARDING_HASH_WORKERS or the CPU count).')
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help='Onboard the valid rows even if others are rejected.')
+
+    def handle(self, *args, **options):
+        onboarding = StudentOnboarding(
+            workers=options['workers'], skip_invalid=options['skip_invalid'],
+            progress=lambda created, total: self.stdout.write(f'{created}/{total} students created'))
+        try:
+            with open(options['file'], 'rb') as source, \
+                    open(options['credentials'], 'w', newline='') as credentials:
+                result = onboarding.run_numbered(read_upload(source, name=options['file']), credentials=credentials)
+        except (OSError, UnreadableUpload) as exc:
+            raise CommandError(str(exc))
+        for number, reason in result.rejected:
+            self.stderr.write(f'Row {number}: {reason}')
+        if result.rejected and not result.created:
+            raise CommandError(f'{len(result.rejected)} of {result.rows} rows were rejected; no accounts were created.')
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created} students from {result.rows} rows in {result.seconds:.1f}s "
+            f"({result.students_per_second}/s); credentials written to {options['credentials']}."
+        ))
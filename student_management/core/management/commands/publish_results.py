@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Exam
+from core.snapshots import publish_snapshot, unpublish_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Publish a static results snapshot for every student, or withdraw it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_id', nargs='?', type=int, help='Exam being published.')
+        parser.add_argument('--unpublish', action='store_true', help='Serve results from the database again.')
+
+    def handle(self, *args, **options):
+        if options['unpublish']:
+            unpublish_snapshot()
+            self.stdout.write('Snapshot withdrawn.')
+            return
+        if options['exam_id'] is None:
+            raise CommandError('Give an exam id or --unpublish.')
+        try:
+            exam = Exam.objects.get(pk=options['exam_id'])
+        except Exam.DoesNotExist:
+            raise CommandError('Unknown exam id.')
+        manifest = publish_snapshot(exam)
+        self.stdout.write(f"Published {manifest['id']}: {manifest['students']} students in {manifest['seconds']}s")
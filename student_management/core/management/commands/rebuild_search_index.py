@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.search import fts_enabled, install_search_index
+
+
+class Command(BaseCommand):
+    help = 'Recreate the student full-text search index and its sync triggers.'
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            raise CommandError('The full-text index is only used on SQLite.')
+        install_search_index()
+        self.stdout.write(self.style.SUCCESS('Student search index rebuilt.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.stats import refresh_classes
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard ClassStatistics from the student and mark tables.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = refresh_classes()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {count} classes.'))
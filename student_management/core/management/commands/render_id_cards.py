@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.idcards import build_id_card_pdf
+from core.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Render print-ready ID card PDF sheets for one section or the whole school.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the PDF to write.')
+        parser.add_argument('--section', type=int, help='ClassSection id (default: every student).')
+        parser.add_argument('--workers', type=int, default=None, help='Render processes (default: CPU count).')
+
+    def handle(self, *args, **options):
+        students = Student.objects.select_related('class_section__school_class', 'class_section__division').order_by(
+            'class_section', 'roll_number', 'pk')
+        if options['section']:
+            students = students.filter(class_section_id=options['section'])
+        result = build_id_card_pdf(students, options['output'], workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {result['cards']} cards on {result['pages']} pages "
+            f"({result['rendered']} rendered, {result['cards'] - result['rendered']} from cache)."
+        ))
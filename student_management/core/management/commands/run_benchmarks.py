@@ -0,0 +1,195 @@
+import io
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.metrics import QueryRecorder
+from core.models import ClassSection, Exam, Mark, Student
+from core.portal import invalidate_students
+from core.results import compute_exam_results
+from core.snapshots import active_snapshot
+
+
+def rolled_back(function):
+    """Run a write benchmark without keeping its changes, so every repeat sees the same data."""
+    def run():
+        with transaction.atomic():
+            function()
+            transaction.set_rollback(True)
+    return run
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Time the key views and operations against the current data and write the results as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', default='benchmarks.json', help='Where to write the results.')
+        parser.add_argument('--compare', help='Earlier results file to compare medians against.')
+        parser.add_argument('--import-rows', type=int, default=5000, help='Rows in the generated Excel import.')
+        parser.add_argument('--only', nargs='*', help='Run only these benchmarks.')
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        admin = User.objects.filter(is_staff=True).order_by('pk').first()
+        if admin is None:
+            raise CommandError('Needs a staff user to log in as.')
+        exam = Exam.objects.annotate(marks=Count('mark')).filter(marks__gt=0).order_by('-date', '-pk').first()
+        if exam is None:
+            raise CommandError('No marks to benchmark against; run generate_dataset first.')
+        # The largest section with someone who sat the exam, so the grid and portal have marks to show
+        section = ClassSection.objects.filter(
+            Exists(Mark.objects.filter(exam=exam, student__class_section=OuterRef('pk'))),
+        ).annotate(students=Count('student')).order_by('-students', 'pk').first()
+        if section is None:
+            raise CommandError(f'No section has marks for {exam.name}; run generate_dataset first.')
+        student = Student.objects.filter(class_section=section, mark__exam=exam).first()
+        self.admin = Client()
+        self.admin.force_login(admin)
+        self.student = Client()
+        self.student.force_login(student.user)
+
+        # Inputs are built once so only the request itself is timed
+        grid = self.changed_grid(section, exam)
+        workbook = self.workbook(exam, options['import_rows'])
+        benchmarks = {
+            'dashboard': lambda: self.get(self.admin, reverse('dashboard')),
+            'mark_report': lambda: self.get(self.admin, reverse('mark_report')),
+            'mark_report_search': lambda: self.get(self.admin, reverse('mark_report'), {'student': student.name.split()[0]}),
+            'csv_export': rolled_back(lambda: self.get(self.admin, reverse('mark_report'), {'export': 'csv', 'exam': exam.pk})),
+            'section_marks_entry': lambda: self.get(self.admin, reverse('section_marks_entry', args=[section.pk]), {'exam': exam.pk}),
+            'section_marks_save': rolled_back(lambda: self.post(
+                self.admin, reverse('section_marks_entry', args=[section.pk]), grid)),
+            'excel_import': rolled_back(lambda: self.post(
+                self.admin, reverse('excel_upload'), {'excel_file': self.upload(workbook)})),
+            'student_results_cold': lambda: (invalidate_students([student.pk]), self.get(self.student, reverse('student-results'))),
+            'student_results_warm': lambda: self.get(self.student, reverse('student-results')),
+            'compute_exam_results': rolled_back(lambda: compute_exam_results(exam)),
+        }
+        if options['only']:
+            unknown = set(options['only']).difference(benchmarks)
+            if unknown:
+                raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+            benchmarks = {name: benchmarks[name] for name in options['only']}
+
+        results = {}
+        # The test client talks to "testserver"; jobs run inside the request so their work is timed
+        with override_settings(ALLOWED_HOSTS=['testserver'], JOBS_INLINE=True):
+            for name, function in benchmarks.items():
+                results[name] = self.measure(function)
+                self.stdout.write(f"{name:24} median {results[name]['median']:.4f}s  queries {results[name]['queries']}")
+
+        report = {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'snapshot_active': active_snapshot() is not None,
+            'dataset': {
+                'sections': ClassSection.objects.count(),
+                'students': Student.objects.count(),
+                'exams': Exam.objects.count(),
+                'marks': Mark.objects.count(),
+            },
+            'repeat': self.repeat,
+            'benchmarks': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def measure(self, function):
+        timings = []
+        for _ in range(self.repeat):
+            recorder = QueryRecorder()
+            with recorder.activate():
+                started = time.perf_counter()
+                function()
+                timings.append(time.perf_counter() - started)
+        return {
+            'median': statistics.median(timings),
+            'min': min(timings),
+            'max': max(timings),
+            'queries': recorder.count,
+            'sql_seconds': recorder.seconds,
+        }
+
+    def _check_response(self, response):
+        if response.status_code not in (200, 302):
+            raise CommandError(f'{response.request["PATH_INFO"]} returned {response.status_code}')
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def get(self, client, url, data=None):
+        return self._check_response(client.get(url, data))
+
+    def post(self, client, url, data):
+        return self._check_response(client.post(url, data))
+
+    def changed_grid(self, section, exam):
+        data = {'exam': exam.pk}
+        subject_ids = list(section.subjects.values_list('pk', flat=True))
+        marks = {
+            (student_id, subject_id): value
+            for student_id, subject_id, value in Mark.objects.filter(
+                exam=exam, student__class_section=section).values_list('student_id', 'subject_id', 'marks_obtained')
+        }
+        for student_id in Student.objects.filter(class_section=section).values_list('pk', flat=True):
+            for subject_id in subject_ids:
+                data[f'mark-{student_id}-{subject_id}'] = (marks.get((student_id, subject_id)) or 0) % 100 + 1
+        return data
+
+    def workbook(self, exam, rows):
+        import openpyxl
+
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(['Student', 'Roll', 'Exam', 'Subject', 'Marks'])
+        marks = Mark.objects.filter(exam=exam).values_list(
+            'student__name', 'student__roll_number', 'subject__name', 'marks_obtained')[:rows]
+        for name, roll_number, subject, value in marks:
+            sheet.append([name, roll_number, exam.name, subject, value % 100 + 1])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return buffer.getvalue()
+
+    def upload(self, content):
+        upload = io.BytesIO(content)
+        upload.name = 'benchmark.xlsx'
+        return upload
+
+    def compare(self, path, results):
+        with open(path) as previous_file:
+            previous = json.load(previous_file)['benchmarks']
+        self.stdout.write(f"\nCompared with {path}:")
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            ratio = result['median'] / previous[name]['median'] if previous[name]['median'] else 0
+            line = f"{name:24} {previous[name]['median']:.4f}s -> {result['median']:.4f}s  x{ratio:.2f}"
+            self.stdout.write(self.style.WARNING(line) if ratio > 1.2 else line)
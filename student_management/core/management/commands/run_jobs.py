@@ -0,0 +1,72 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import jobs
+
+# Requeue lost jobs and purge expired results this often (seconds)
+HOUSEKEEPING_INTERVAL = 15 * 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background jobs (mark imports, CSV exports, ID card PDFs) in a process pool. '
+        'Keep one instance running next to the web server, e.g. under systemd or supervisor.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Jobs run at once (default: settings.JOB_WORKERS or the CPU count).')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds between checks for new jobs.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or jobs.worker_count()
+        self.stdout.write(f'Running jobs with {workers} workers.')
+        self.housekeeping = 0
+        # A pool whose process was killed (e.g. out of memory) is unusable: start a new one
+        while not self.run_pool(workers, options):
+            self.stderr.write('A worker process died; restarting the pool.')
+
+    def run_pool(self, workers, options):
+        """Run jobs until the queue is empty (--once) or the pool breaks; True means done."""
+        running = {}
+        # spawn, not fork: children must not inherit this process's database connection.
+        # Each starts from scratch, so django.setup() runs before any job is unpickled.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=django.setup) as pool:
+            while True:
+                if time.monotonic() - self.housekeeping > HOUSEKEEPING_INTERVAL:
+                    requeued, purged = jobs.requeue_stale(), jobs.purge_expired()
+                    if requeued or purged:
+                        self.stdout.write(f'Requeued {requeued} stale jobs, purged {purged} expired jobs.')
+                    self.housekeeping = time.monotonic()
+                while len(running) < workers:
+                    job_id = jobs.claim_next()
+                    if job_id is None:
+                        break
+                    try:
+                        running[pool.submit(jobs.run_job_in_worker, job_id)] = job_id
+                    except BrokenProcessPool:
+                        jobs.requeue(job_id)
+                        return False
+                close_old_connections()
+                if not running:
+                    if options['once']:
+                        return True
+                    time.sleep(options['poll'])
+                    continue
+                done, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        status = future.result()
+                    except Exception as exc:  # BrokenProcessPool, or run_job could not record the outcome
+                        status = 'lost'
+                        jobs.mark_failed(job_id, f'The job stopped unexpectedly: {exc!r}')
+                    self.stdout.write(f'Job {job_id}: {status}')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.templating import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Compile every template in core/templates and report syntax errors. Workers do the same '
+        'in-process on start (settings.WARM_TEMPLATES); run this in deploy scripts to catch a '
+        'broken template before the workers are restarted.'
+    )
+
+    def handle(self, *args, **options):
+        count, seconds, errors = warm_templates()
+        for name, exc in errors:
+            self.stderr.write(f'{name}: {exc}')
+        if errors:
+            raise CommandError(f'{len(errors)} of {count} templates failed to compile.')
+        self.stdout.write(f'Compiled {count} templates in {seconds * 1000:.0f}ms')
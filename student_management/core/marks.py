@@ -0,0 +1,111 @@
+import math
+
+from .database import write_transaction
+from .models import Mark
+from .results import MAX_MARKS_PER_SUBJECT
+from .signals import marks_bulk_changed
+
+# Keep bulk statements well under SQLite's variable limit
+MARK_BATCH_SIZE = 2000
+
+
+def existing_marks(keys):
+    """Map (student_id, exam_id, subject_id) keys to their stored marks."""
+    keys = set(keys)
+    if not keys:
+        return {}
+    found = Mark.objects.filter(
+        student_id__in={key[0] for key in keys},
+        exam_id__in={key[1] for key in keys},
+        subject_id__in={key[2] for key in keys},
+    ).values_list('student_id', 'exam_id', 'subject_id', 'marks_obtained')
+    return {row[:3]: row[3] for row in found if row[:3] in keys}
+
+
+def upsert_marks(rows, batch_size=MARK_BATCH_SIZE, previous=None):
+    """
+    Insert or update marks from (student_id, exam_id, subject_id, marks_obtained)
+    tuples using INSERT ... ON CONFLICT on the (student, exam, subject)
+    constraint. Rows whose value is unchanged are skipped. Returns the number of
+    rows written. Call inside a transaction.
+
+    `previous` may map every key in `rows` to its stored value (missing keys
+    are new marks) when the caller has already loaded them.
+    """
+    rows = list(rows)
+    written = 0
+    for start in range(0, len(rows), batch_size):
+        batch = {row[:3]: row[3] for row in rows[start:start + batch_size]}
+        if previous is None:
+            batch_previous = existing_marks(batch)
+        else:
+            batch_previous = {key: previous[key] for key in batch if key in previous}
+        changes = [
+            key + (batch_previous.get(key), value)
+            for key, value in batch.items() if batch_previous.get(key) != value
+        ]
+        if not changes:
+            continue
+        Mark.objects.bulk_create(
+            [Mark(student_id=s, exam_id=e, subject_id=sub, marks_obtained=new) for s, e, sub, _, new in changes],
+            update_conflicts=True,
+            unique_fields=['student', 'exam', 'subject'],
+            update_fields=['marks_obtained'],
+        )
+        marks_bulk_changed.send(sender=Mark, changes=changes)
+        written += len(changes)
+    return written
+
+
+def student_marks(student, exam):
+    """{subject_id: marks} for one student and exam, in a single query."""
+    return dict(Mark.objects.filter(student=student, exam=exam).values_list('subject_id', 'marks_obtained'))
+
+
+def save_student_marks(student, exam, values):
+    """
+    Save {subject_id: marks} for one student and exam, writing only the values
+    that differ from what is stored. Returns (saved, unchanged).
+    """
+    with write_transaction():
+        # Read under the write lock so concurrent saves never see each other's old values
+        existing = student_marks(student, exam)
+        changed = [(student.pk, exam.pk, subject_id, value)
+                   for subject_id, value in values.items() if existing.get(subject_id) != value]
+        saved = upsert_marks(changed, previous={
+            (student.pk, exam.pk, subject_id): value for subject_id, value in existing.items()
+        })
+    return saved, len(values) - saved
+
+
+def section_marks(section, exam):
+    """{(student_id, subject_id): marks} for one section and exam, in a single query."""
+    rows = Mark.objects.filter(exam=exam, student__class_section=section).values_list(
+        'student_id', 'subject_id', 'marks_obtained')
+    return {(student_id, subject_id): value for student_id, subject_id, value in rows}
+
+
+def valid_mark(value):
+    return value is not None and math.isfinite(value) and 0 <= value <= MAX_MARKS_PER_SUBJECT
+
+
+def read_mark_grid(data, student_ids, subject_ids, prefix='mark'):
+    """
+    Read `<prefix>-<student_id>-<subject_id>` inputs. Blank cells are skipped;
+    anything but a number from 0 to MAX_MARKS_PER_SUBJECT is invalid. Returns ({(student_id, subject_id): value}, {(student_id, subject_id): raw}) for valid and invalid cells.
+    """
+    values, errors = {}, {}
+    for student_id in student_ids:
+        for subject_id in subject_ids:
+            raw = data.get(f'{prefix}-{student_id}-{subject_id}', '').strip()
+            if not raw:
+                continue
+            try:
+                value = float(raw)
+            except ValueError:
+                value = None
+            if not valid_mark(value):
+                errors[(student_id, subject_id)] = raw
+            else:
+                values[(student_id, subject_id)] = value
+    return values, errors
@@ -0,0 +1,167 @@
+import contextvars
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Overridable in settings.py
+N_PLUS_ONE_THRESHOLD = getattr(settings, 'METRICS_N_PLUS_ONE_THRESHOLD', 10)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+HISTOGRAMS = {
+    'sms_request_duration_seconds': ('Wall time per request.', DURATION_BUCKETS),
+    'sms_db_queries': ('SQL queries per request.', QUERY_BUCKETS),
+    'sms_db_duration_seconds': ('Time spent in SQL per request.', DURATION_BUCKETS),
+}
+COUNTERS = {
+    'sms_db_duplicate_queries_total': 'Queries repeating a shape already run in the same request.',
+    'sms_n_plus_one_total': 'Requests where one query shape ran more than the N+1 threshold.',
+}
+
+# Recorders active in the current context. Concurrent async requests can share
+# a connection, so queries are attributed through the context, not the connection.
+_active = contextvars.ContextVar('query_recorders', default=())
+
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_VALUES = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def query_shape(sql):
+    """SQL with parameters, literals and IN lists collapsed, so N+1 loops share one shape."""
+    sql = _STRING.sub('?', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    sql = _VALUES.sub('(...), ...', sql)
+    return _NUMBER.sub('?', sql)
+
+
+class QueryRecorder:
+    """Counts and times the queries of one request while activate() is in effect."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    @contextmanager
+    def activate(self):
+        token = _active.set(_active.get() + (self,))
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    def add(self, shape, seconds):
+        self.seconds += seconds
+        self.count += 1
+        self.shapes[shape] += 1
+
+    def duplicates(self):
+        return sum(count - 1 for count in self.shapes.values())
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        # Batched writes repeat by design; N+1 loops show up as repeated reads
+        return [
+            (shape, count) for shape, count in self.shapes.most_common()
+            if count > threshold and shape.lstrip().upper().startswith('SELECT')
+        ]
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection; a no-op unless a recorder is active."""
+    recorders = _active.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - started
+        shape = query_shape(sql)
+        for recorder in recorders:
+            recorder.add(shape, seconds)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # connection_created handler. Installed once and kept, so requests need no
+    # per-connection setup (async requests would otherwise hop threads for it).
+    # First in the list, so execute_wrapper() blocks still pop their own wrapper.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    In-process metrics, labelled by view name. Each worker process keeps its own
+    numbers; the scraper sees the worker that answered.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.histograms = {name: {} for name in HISTOGRAMS}
+        self.counters = {name: Counter() for name in COUNTERS}
+
+    def observe(self, name, view, value):
+        series = self.histograms[name]
+        if view not in series:
+            series[view] = Histogram(HISTOGRAMS[name][1])
+        series[view].observe(value)
+
+    def record(self, view, seconds, recorder):
+        repeated = recorder.repeated()
+        with self.lock:
+            self.observe('sms_request_duration_seconds', view, seconds)
+            self.observe('sms_db_queries', view, recorder.count)
+            self.observe('sms_db_duration_seconds', view, recorder.seconds)
+            self.counters['sms_db_duplicate_queries_total'][view] += recorder.duplicates()
+            if repeated:
+                self.counters['sms_n_plus_one_total'][view] += 1
+        for shape, count in repeated:
+            logger.warning('Possible N+1 in %s: query ran %d times: %s', view, count, shape)
+
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for name, (help_text, buckets) in HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for view, histogram in sorted(self.histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{view="{view}"}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{view="{view}"}} {histogram.count}')
+            for name, help_text in COUNTERS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for view, value in sorted(self.counters[name].items()):
+                    lines.append(f'{name}{{view="{view}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
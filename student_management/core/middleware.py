@@ -0,0 +1,71 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .database import read_only_request
+from .metrics import QueryRecorder, registry
+
+
+class QueryMetricsMiddleware:
+    """
+    Record wall time, SQL count, SQL time and repeated query shapes per view.
+    Queries run while a streaming response is consumed are not included.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with recorder.activate():
+            response = self.get_response(request)
+        self.record(request, started, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with recorder.activate():
+            response = await self.get_response(request)
+        self.record(request, started, recorder)
+        return response
+
+    def record(self, request, started, recorder):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        registry.record(view, time.perf_counter() - started, recorder)
+
+
+class ReadOnlyRoutingMiddleware:
+    """Mark safe-method requests so core.database.ReadWriteRouter can send their reads to the replica."""
+    sync_capable = True
+    async_capable = True
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = read_only_request.set(request.method in self.SAFE_METHODS)
+        try:
+            return self.get_response(request)
+        finally:
+            read_only_request.reset(token)
+
+    async def __acall__(self, request):
+        token = read_only_request.set(request.method in self.SAFE_METHODS)
+        try:
+            return await self.get_response(request)
+        finally:
+            read_only_request.reset(token)
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_marks(apps, schema_editor):
+    # Keep the most recently written mark for each (student, exam, subject)
+    Mark = apps.get_model('core', 'Mark')
+    keep = Mark.objects.values('student', 'exam', 'subject').annotate(keep_id=Max('id')).values('keep_id')
+    Mark.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_classsection_subjects'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_marks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['date'], name='exam_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mark',
+            index=models.Index(fields=['exam', 'subject'], name='mark_exam_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['roll_number'], name='student_roll_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['name'], name='student_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='mark',
+            constraint=models.UniqueConstraint(fields=('student', 'exam', 'subject'), name='unique_mark_student_exam_subject'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_statistics(apps, schema_editor):
+    Class = apps.get_model('core', 'Class')
+    ClassStatistics = apps.get_model('core', 'ClassStatistics')
+    Student = apps.get_model('core', 'Student')
+    Mark = apps.get_model('core', 'Mark')
+    students = dict(
+        Student.objects.values('class_section__school_class_id').annotate(count=Count('id'))
+        .values_list('class_section__school_class_id', 'count')
+    )
+    marks = {
+        row['student__class_section__school_class_id']: row
+        for row in Mark.objects.values('student__class_section__school_class_id')
+        .annotate(count=Count('id'), total=Sum('marks_obtained'))
+    }
+    ClassStatistics.objects.bulk_create([
+        ClassStatistics(
+            school_class_id=class_id,
+            student_count=students.get(class_id, 0),
+            mark_count=marks.get(class_id, {}).get('count', 0),
+            mark_total=marks.get(class_id, {}).get('total') or 0.0,
+        )
+        for class_id in Class.objects.values_list('pk', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_mark_constraints_and_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_count', models.PositiveIntegerField(default=0)),
+                ('mark_count', models.PositiveIntegerField(default=0)),
+                ('mark_total', models.FloatField(default=0)),
+                ('school_class', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='core.class')),
+            ],
+        ),
+        migrations.RunPython(build_statistics, migrations.RunPython.noop),
+    ]
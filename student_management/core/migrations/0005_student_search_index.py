@@ -0,0 +1,52 @@
+from django.db import migrations
+
+CREATE_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS core_student_fts USING fts5(
+        name, roll_number, guardian_name,
+        content='core_student', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS core_student_fts_ai AFTER INSERT ON core_student BEGIN
+        INSERT INTO core_student_fts(rowid, name, roll_number, guardian_name)
+        VALUES (new.id, new.name, new.roll_number, new.guardian_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_student_fts_ad AFTER DELETE ON core_student BEGIN
+        INSERT INTO core_student_fts(core_student_fts, rowid, name, roll_number, guardian_name)
+        VALUES ('delete', old.id, old.name, old.roll_number, old.guardian_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_student_fts_au AFTER UPDATE ON core_student BEGIN
+        INSERT INTO core_student_fts(core_student_fts, rowid, name, roll_number, guardian_name)
+        VALUES ('delete', old.id, old.name, old.roll_number, old.guardian_name);
+        INSERT INTO core_student_fts(rowid, name, roll_number, guardian_name)
+        VALUES (new.id, new.name, new.roll_number, new.guardian_name);
+    END""",
+    "INSERT INTO core_student_fts(core_student_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS core_student_fts_ai",
+    "DROP TRIGGER IF EXISTS core_student_fts_ad",
+    "DROP TRIGGER IF EXISTS core_student_fts_au",
+    "DROP TABLE IF EXISTS core_student_fts",
+]
+
+
+def run_sql(statements):
+    # FTS5 is SQLite only; other databases fall back to icontains in core.search
+    def apply(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_classstatistics'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sql(CREATE_SQL), run_sql(DROP_SQL)),
+    ]
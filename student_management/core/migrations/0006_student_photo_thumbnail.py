@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_student_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='photo_thumbnail',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_student_photo_thumbnail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.FloatField()),
+                ('subject_count', models.PositiveIntegerField()),
+                ('percentage', models.FloatField()),
+                ('grade', models.CharField(max_length=2)),
+                ('section_rank', models.PositiveIntegerField()),
+                ('class_rank', models.PositiveIntegerField()),
+                ('subject_percentiles', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('class_section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.classsection')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='core.exam')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exam_results', to='core.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['exam', 'class_section', 'section_rank'], name='result_section_rank_idx'), models.Index(fields=['exam', 'class_rank'], name='result_class_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('exam', 'student'), name='unique_result_exam_student')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedExam',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exam_id', models.PositiveIntegerField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('mark_count', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-date', '-pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedMark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_id', models.PositiveIntegerField()),
+                ('roll_number', models.CharField(max_length=20)),
+                ('student_name', models.CharField(max_length=100)),
+                ('class_section', models.CharField(max_length=110)),
+                ('subject', models.CharField(max_length=100)),
+                ('marks_obtained', models.FloatField()),
+                ('archived_exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='marks', to='core.archivedexam')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['archived_exam', 'class_section', 'roll_number'], name='archivedmark_section_idx'), models.Index(fields=['student_id'], name='archivedmark_student_idx')],
+            },
+        ),
+    ]
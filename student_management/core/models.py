@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .thumbnails import derivative_url
+
 # === SchoolClass & Division ===
 
 class Class(models.Model):
@@ -47,21 +49,39 @@ class Student(models.Model):
     roll_number = models.CharField(max_length=20)
     class_section = models.ForeignKey(ClassSection, on_delete=models.CASCADE)
     profile_photo = models.ImageField(upload_to='profile_photos/', blank=True, null=True)
+    # Key of the resized copies made by core.thumbnails (nullable so SQLite can add it in place)
+    photo_thumbnail = models.CharField(max_length=255, blank=True, null=True, editable=False)
     date_of_birth = models.DateField(blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
     guardian_name = models.CharField(max_length=100, blank=True, null=True)
     guardian_phone = models.CharField(max_length=20, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['roll_number'], name='student_roll_number_idx'),
+            models.Index(fields=['name'], name='student_name_idx'),
+        ]
+
     def __str__(self):
         return f"{self.roll_number} - {self.name}"
 
+    def thumbnail_url(self, size='small', extension='webp'):
+        if not self.photo_thumbnail:
+            return self.profile_photo.url if self.profile_photo else ''
+        return derivative_url(self.photo_thumbnail, size, extension)
+
 # === Exams & Marks ===
 
 class Exam(models.Model):
     name = models.CharField(max_length=100)
     date = models.DateField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='exam_date_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -71,5 +91,145 @@ class Mark(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
     marks_obtained = models.FloatField()
 
+    class Meta:
+        constraints = [
+            # Also serves (student), (student, exam) lookups and ON CONFLICT upserts
+            models.UniqueConstraint(fields=['student', 'exam', 'subject'], name='unique_mark_student_exam_subject'),
+        ]
+        indexes = [
+            models.Index(fields=['exam', 'subject'], name='mark_exam_subject_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student.name} - {self.subject.name} - {self.marks_obtained}"
+
+# === Dashboard Statistics ===
+
+class ClassStatistics(models.Model):
+    """Running totals per class, kept current by core.signals."""
+    school_class = models.OneToOneField(Class, on_delete=models.CASCADE, related_name='statistics')
+    student_count = models.PositiveIntegerField(default=0)
+    mark_count = models.PositiveIntegerField(default=0)
+    mark_total = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"Statistics for {self.school_class.name}"
+
+    @property
+    def average_mark(self):
+        if not self.mark_count:
+            return None
+        return round(self.mark_total / self.mark_count, 2)
+
+# === Exam Results ===
+
+class ExamResult(models.Model):
+    """Per-student totals, ranks and grades for one exam, written by core.results."""
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='results')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='exam_results')
+    class_section = models.ForeignKey(ClassSection, on_delete=models.CASCADE)
+    total = models.FloatField()
+    subject_count = models.PositiveIntegerField()
+    percentage = models.FloatField()
+    grade = models.CharField(max_length=2)
+    section_rank = models.PositiveIntegerField()
+    class_rank = models.PositiveIntegerField()
+    # {subject_id: percentile of the student's mark among everyone who sat that subject}
+    subject_percentiles = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['exam', 'student'], name='unique_result_exam_student'),
+        ]
+        indexes = [
+            models.Index(fields=['exam', 'class_section', 'section_rank'], name='result_section_rank_idx'),
+            models.Index(fields=['exam', 'class_rank'], name='result_class_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.name} - {self.exam.name} - {self.percentage}%"
+
+# === Archive ===
+
+class ArchivedExam(models.Model):
+    """A past exam moved out of the live tables by core.archive; read-only."""
+    # Id of the deleted Exam row, so an interrupted archive run can resume
+    exam_id = models.PositiveIntegerField(unique=True)
+    name = models.CharField(max_length=100)
+    date = models.DateField()
+    mark_count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date', '-pk']
+
+    def __str__(self):
+        return f"{self.name} ({self.date}, archived)"
+
+class ArchivedMark(models.Model):
+    """
+    One mark of an archived exam, with the names it was reported under copied
+    in: the student, section and subject may be deleted later.
+    """
+    archived_exam = models.ForeignKey(ArchivedExam, on_delete=models.CASCADE, related_name='marks')
+    student_id = models.PositiveIntegerField()
+    roll_number = models.CharField(max_length=20)
+    student_name = models.CharField(max_length=100)
+    class_section = models.CharField(max_length=110)
+    subject = models.CharField(max_length=100)
+    marks_obtained = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['archived_exam', 'class_section', 'roll_number'], name='archivedmark_section_idx'),
+            models.Index(fields=['student_id'], name='archivedmark_student_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_name} - {self.subject} - {self.marks_obtained}"
+
+# === Background Jobs ===
+
+class Job(models.Model):
+    """A unit of work for the run_jobs worker; see core.jobs."""
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    # Relative to settings.JOB_ROOT
+    result_file = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Doubles as the heartbeat: progress updates touch it
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+    def get_kind_display(self):
+        return self.kind.replace('_', ' ').capitalize()
+
+    @property
+    def finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    @property
+    def percent(self):
+        if self.status == self.DONE:
+            return 100
+        return min(100, round(100 * self.progress / self.total)) if self.total else 0
@@ -0,0 +1,233 @@
+"""
+Bulk student onboarding from a sheet of students. Every row is validated
+before anything is written; passwords (given or generated) are hashed in a
+process pool, since PBKDF2 costs about a third of a second per account, and
+User and Student rows are bulk-inserted in chunked write transactions.
+Each created account is written to a credentials sheet as its chunk commits.
+"""
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.utils.crypto import get_random_string
+from django.utils.text import slugify
+
+from .database import write_transaction
+from .importers import cell_date, clean_cell
+from .models import ClassSection, Student
+from .stats import refresh_classes
+
+ONBOARDING_CHUNK_SIZE = getattr(settings, 'ONBOARDING_CHUNK_SIZE', 500)
+PASSWORD_LENGTH = 10
+# No look-alike characters (0/O, 1/l/I): the sheet is read off paper
+PASSWORD_CHARS = 'abcdefghjkmnpqrstuvwxyzABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+CREDENTIALS_HEADER = ['Section', 'Roll', 'Name', 'Username', 'Password']
+
+
+def hash_workers():
+    return getattr(settings, 'ONBOARDING_HASH_WORKERS', None)
+
+
+class OnboardingResult:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.rejected = []  # (row number, reason)
+        self.sections = set()
+        self.seconds = 0.0
+
+    @property
+    def students_per_second(self):
+        return round(self.created / self.seconds, 1) if self.seconds else self.created
+
+
+class StudentOnboarding:
+    """
+    Create a user account and Student for every row. Rows are dicts with Name,
+    Roll and either Section ("10A") or Class and Division columns, plus
+    optional Username, Password, Email, Date of Birth, Phone, Address,
+    Guardian and Guardian Phone. Missing usernames become section-roll
+    ("10a-12"), missing passwords are generated.
+
+    With skip_invalid=False (the default) one bad row stops the whole import
+    before anything is written; otherwise valid rows are onboarded and the
+    rest reported.
+    """
+
+    def __init__(self, chunk_size=ONBOARDING_CHUNK_SIZE, workers=None, skip_invalid=False, progress=None):
+        self.chunk_size = chunk_size
+        self.workers = workers or hash_workers()
+        self.skip_invalid = skip_invalid
+        # Called with (students created, students to create) after every chunk
+        self.progress = progress
+
+    def run(self, rows):
+        return self.run_numbered(enumerate(rows, start=2))
+
+    def run_numbered(self, numbered_rows, credentials=None):
+        """Onboard (row number, row) pairs, e.g. from read_upload(); credentials is a writable text file."""
+        result = OnboardingResult()
+        started = time.perf_counter()
+        accounts = self.validate(numbered_rows, result)
+        if result.rejected and not self.skip_invalid:
+            result.seconds = time.perf_counter() - started
+            return result
+        writer = None
+        if credentials is not None:
+            writer = csv.writer(credentials)
+            writer.writerow(CREDENTIALS_HEADER)
+        committed = set()
+        try:
+            for chunk in self._create(accounts):
+                result.created += len(chunk)
+                committed.update(account['section'] for account in chunk)
+                if writer:
+                    writer.writerows([
+                        [account['section_name'], account['roll'], account['name'], account['username'], account['password']]
+                        for account in chunk
+                    ])
+                    credentials.flush()
+                if self.progress:
+                    self.progress(result.created, len(accounts))
+        finally:
+            if committed:
+                # bulk_create skips the signals that keep class statistics and the dashboard current;
+                # the search index follows through its triggers. Chunks already committed are counted
+                # even when a later one fails.
+                refresh_classes(ClassSection.objects.filter(pk__in=committed).values('school_class_id'))
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def validate(self, numbered_rows, result):
+        """Parse every row, recording problems in result.rejected; returns the accounts to create."""
+        sections = self._sections()
+        accounts = []
+        usernames = {}
+        rolls = {}
+        for number, row in numbered_rows:
+            result.rows += 1
+            name = clean_cell(row.get('Name'))
+            roll = clean_cell(row.get('Roll'))
+            section_name = clean_cell(row.get('Section')) or clean_cell(row.get('Class')) + clean_cell(row.get('Division'))
+            if not (name and roll and section_name):
+                result.rejected.append((number, 'Missing name, roll or section.'))
+                continue
+            section_id = sections.get(section_name.lower())
+            if section_id is None:
+                result.rejected.append((number, f'Unknown section "{section_name}".'))
+                continue
+            if section_id == 0:
+                result.rejected.append((number, f'Section "{section_name}" is ambiguous.'))
+                continue
+            username = clean_cell(row.get('Username')) or slugify(f'{section_name}-{roll}')
+            email = clean_cell(row.get('Email'))
+            try:
+                User.username_validator(username)
+            except ValidationError as exc:
+                result.rejected.append((number, exc.messages[0]))
+                continue
+            if email:
+                try:
+                    validate_email(email)
+                except ValidationError:
+                    result.rejected.append((number, f'Email "{email}" is not a valid address.'))
+                    continue
+            try:
+                date_of_birth = cell_date(row.get('Date of Birth'))
+            except ValueError as exc:
+                result.rejected.append((number, f'Date of birth {exc}'))
+                continue
+            if username in usernames:
+                result.rejected.append((number, f'Username "{username}" is also used on row {usernames[username]}.'))
+                continue
+            if (section_id, roll) in rolls:
+                result.rejected.append((number, f'Roll {roll} in {section_name} is also used on row {rolls[section_id, roll]}.'))
+                continue
+            usernames[username] = rolls[section_id, roll] = number
+            accounts.append({
+                'row': number,
+                'name': name[:100],
+                'roll': roll,
+                'section': section_id,
+                'section_name': section_name,
+                'username': username,
+                'password': clean_cell(row.get('Password')) or get_random_string(PASSWORD_LENGTH, PASSWORD_CHARS),
+                'email': email,
+                'date_of_birth': date_of_birth,
+                'address': clean_cell(row.get('Address')) or None,
+                'phone': clean_cell(row.get('Phone'))[:20] or None,
+                'guardian_name': clean_cell(row.get('Guardian'))[:100] or None,
+                'guardian_phone': clean_cell(row.get('Guardian Phone'))[:20] or None,
+            })
+        taken = self._existing(usernames, rolls)
+        if taken:
+            rejected = {number: reason for number, reason in taken}
+            result.rejected.extend(taken)
+            accounts = [account for account in accounts if account['row'] not in rejected]
+        result.rejected.sort()
+        result.sections.update(account['section'] for account in accounts)
+        return accounts
+
+    def _sections(self):
+        sections = {}
+        for pk, class_name, division_name in ClassSection.objects.values_list(
+                'pk', 'school_class__name', 'division__name'):
+            key = f'{class_name}{division_name}'.lower()
+            # 0 marks a name shared by more than one section
+            sections[key] = 0 if key in sections else pk
+        return sections
+
+    def _existing(self, usernames, rolls):
+        """(row number, reason) for rows clashing with accounts and roll numbers already in the database."""
+        taken = []
+        names = list(usernames)
+        for start in range(0, len(names), self.chunk_size):
+            for username in User.objects.filter(username__in=names[start:start + self.chunk_size]).values_list(
+                    'username', flat=True):
+                taken.append((usernames[username], f'Username "{username}" already exists.'))
+        section_ids = {section_id for section_id, _ in rolls}
+        for key in Student.objects.filter(class_section_id__in=section_ids).values_list('class_section_id', 'roll_number'):
+            if key in rolls:
+                taken.append((rolls[key], f'Roll {key[1]} is already taken in this section.'))
+        return taken
+
+    def _create(self, accounts):
+        """Hash and insert the accounts chunk by chunk, yielding each chunk once committed."""
+        hashes = self._hashes([account['password'] for account in accounts])
+        for start in range(0, len(accounts), self.chunk_size):
+            chunk = accounts[start:start + self.chunk_size]
+            # Hashing runs ahead in the pool while earlier chunks are written
+            users = [
+                User(username=account['username'], email=account['email'], password=next(hashes))
+                for account in chunk
+            ]
+            with write_transaction():
+                User.objects.bulk_create(users)
+                Student.objects.bulk_create([
+                    Student(
+                        user=user,
+                        name=account['name'],
+                        roll_number=account['roll'],
+                        class_section_id=account['section'],
+                        date_of_birth=account['date_of_birth'],
+                        address=account['address'],
+                        phone=account['phone'],
+                        guardian_name=account['guardian_name'],
+                        guardian_phone=account['guardian_phone'],
+                    )
+                    for user, account in zip(users, chunk)
+                ])
+            yield chunk
+
+    def _hashes(self, passwords):
+        if len(passwords) < 8 or self.workers == 1:
+            yield from map(make_password, passwords)
+            return
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            yield from pool.map(make_password, passwords, chunksize=16)
+
@@ -0,0 +1,146 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _field(model, name):
+    *path, last = name.split('__')
+    for part in path:
+        model = model._meta.get_field(part).related_model
+    return model._meta.pk if last == 'pk' else model._meta.get_field(last)
+
+
+def clean_cursor(model, fields, values):
+    """
+    The cursor's values converted by their ordering fields, or None when the
+    cursor does not fit `fields` (e.g. it was edited by hand).
+    """
+    if not values or len(values) != len(fields):
+        return None
+    try:
+        cleaned = [_field(model, field.lstrip('-')).to_python(value) for field, value in zip(fields, values)]
+    except (ValidationError, FieldDoesNotExist, TypeError, ValueError):
+        return None
+    return None if None in cleaned else cleaned
+
+
+def _after(fields, values, reverse):
+    """Q for rows strictly after `values` in (fields) order, or before when reverse."""
+    condition = Q()
+    for i in reversed(range(len(fields))):
+        name = fields[i].lstrip('-')
+        descending = fields[i].startswith('-') != reverse
+        step = Q(**{f'{name}__lt' if descending else f'{name}__gt': values[i]})
+        condition = step if i == len(fields) - 1 else step | (Q(**{name: values[i]}) & condition)
+    return condition
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, prev_cursor, count=None, query=''):
+        self.object_list = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.count = count
+        # Current filters without the cursor, for building page links
+        self.query = query
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+def _page_query(queryset, request, fields, per_page):
+    """
+    The slice holding one page plus a look-ahead row, and the decoded cursors.
+    A cursor that does not fit the ordering is ignored, giving the first page.
+    """
+    after = clean_cursor(queryset.model, fields, decode_cursor(request.GET.get('after', '')))
+    before = clean_cursor(queryset.model, fields, decode_cursor(request.GET.get('before', '')))
+    if before:
+        # Walk backwards from the cursor; _make_page flips the page back into order
+        reversed_fields = [field[1:] if field.startswith('-') else f'-{field}' for field in fields]
+        return queryset.filter(_after(fields, before, reverse=True)).order_by(*reversed_fields)[:per_page + 1], True, after
+    page_qs = queryset.order_by(*fields)
+    if after:
+        page_qs = page_qs.filter(_after(fields, after, reverse=False))
+    return page_qs[:per_page + 1], False, after
+
+
+def _make_page(rows, backwards, after, fields, per_page, count, request):
+    has_more = len(rows) > per_page
+    if backwards:
+        rows = rows[:per_page][::-1]
+        has_prev, has_next = has_more, True
+    else:
+        rows = rows[:per_page]
+        has_prev, has_next = bool(after), has_more
+    names = [field.lstrip('-') for field in fields]
+
+    def key(row):
+        return [_value(row, name) for name in names]
+
+    next_cursor = encode_cursor(key(rows[-1])) if rows and has_next else None
+    prev_cursor = encode_cursor(key(rows[0])) if rows and has_prev else None
+    params = request.GET.copy()
+    for name in ('after', 'before'):
+        params.pop(name, None)
+    return KeysetPage(rows, next_cursor, prev_cursor, count, params.urlencode())
+
+
+def keyset_paginate(queryset, request, ordering=('pk',), per_page=PAGE_SIZE):
+    """
+    Cursor pagination over `ordering`, which must end in a unique field.
+    Reads ?after= / ?before= cursors; ?count=1 adds an exact total.
+    """
+    fields = list(ordering)
+    page_qs, backwards, after = _page_query(queryset, request, fields, per_page)
+    rows = list(page_qs)
+    count = queryset.count() if request.GET.get('count') == '1' else None
+    return _make_page(rows, backwards, after, fields, per_page, count, request)
+
+
+async def akeyset_paginate(queryset, request, ordering=('pk',), per_page=PAGE_SIZE):
+    """keyset_paginate() for async views."""
+    fields = list(ordering)
+    page_qs, backwards, after = _page_query(queryset, request, fields, per_page)
+    rows = [row async for row in page_qs]
+    count = await queryset.acount() if request.GET.get('count') == '1' else None
+    return _make_page(rows, backwards, after, fields, per_page, count, request)
+
+
+def _value(row, name):
+    *path, last = name.split('__')
+    for part in path:
+        row = row[part] if isinstance(row, dict) else getattr(row, part)
+    if isinstance(row, dict):
+        return row[last]
+    if last == 'pk':
+        return row.pk
+    # A foreign key's cursor holds its id, not the related object's str()
+    return getattr(row, row._meta.get_field(last).attname)
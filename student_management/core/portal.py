@@ -0,0 +1,91 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache_versions import aversion, bump, version
+from .models import Exam, Mark
+
+# Entries are dropped precisely when a student's marks change, so they can live long
+STUDENT_RESULTS_TIMEOUT = 24 * 60 * 60
+# Bumped when exams or subjects change, which touches every student's page
+VERSION_KEY = 'student-results:version'
+
+
+def _key(student_id, version):
+    return f'student-results:{version}:{student_id}'
+
+
+def group_marks(rows):
+    """
+    Group (exam_id, exam_name, exam_date, subject_name, marks) rows, ordered by
+    exam, into the plain structure the student templates render.
+    """
+    exam_results = []
+    for exam_id, exam_name, exam_date, subject_name, marks in rows:
+        if not exam_results or exam_results[-1]['exam']['id'] != exam_id:
+            exam_results.append({'exam': {'id': exam_id, 'name': exam_name, 'date': exam_date}, 'marks': []})
+        exam_results[-1]['marks'].append({'subject': {'name': subject_name}, 'marks_obtained': marks})
+    return exam_results
+
+
+def results_summary(exam_results, latest_exam):
+    """Average for the most recent exam, when the student sat it."""
+    if not latest_exam:
+        return None
+    for result in exam_results:
+        if result['exam']['id'] == latest_exam['id'] and result['marks']:
+            marks = [mark['marks_obtained'] for mark in result['marks']]
+            return {
+                'exam_name': latest_exam['name'],
+                'exam_date': latest_exam['date'],
+                'average_score': round(sum(marks) / len(marks), 2),
+            }
+    return None
+
+
+def _mark_rows(student_id):
+    return Mark.objects.filter(student_id=student_id).order_by('-exam__date', 'exam_id', 'subject__name').values_list(
+        'exam_id', 'exam__name', 'exam__date', 'subject__name', 'marks_obtained')
+
+
+def _latest_exam():
+    return Exam.objects.order_by('-date', '-pk').values('id', 'name', 'date')
+
+
+def build_student_results(student_id):
+    exam_results = group_marks(_mark_rows(student_id))
+    latest_exam = _latest_exam().first()
+    return {'exam_results': exam_results, 'results_summary': results_summary(exam_results, latest_exam)}
+
+
+async def abuild_student_results(student_id):
+    exam_results = group_marks([row async for row in _mark_rows(student_id)])
+    latest_exam = await _latest_exam().afirst()
+    return {'exam_results': exam_results, 'results_summary': results_summary(exam_results, latest_exam)}
+
+
+def get_student_results(student_id):
+    key = _key(student_id, version(VERSION_KEY))
+    results = cache.get(key)
+    if results is None:
+        results = build_student_results(student_id)
+        cache.set(key, results, STUDENT_RESULTS_TIMEOUT)
+    return results
+
+
+async def aget_student_results(student_id):
+    key = _key(student_id, await aversion(VERSION_KEY))
+    results = await cache.aget(key)
+    if results is None:
+        results = await abuild_student_results(student_id)
+        await cache.aset(key, results, STUDENT_RESULTS_TIMEOUT)
+    return results
+
+
+def invalidate_students(student_ids):
+    # After commit, so a concurrent request cannot re-cache the old marks
+    keys = {_key(student_id, version(VERSION_KEY)) for student_id in student_ids}
+    transaction.on_commit(lambda: cache.delete_many(list(keys)))
+
+
+def invalidate_all_students():
+    transaction.on_commit(lambda: bump(VERSION_KEY))
@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+
+from .database import write_transaction
+from .models import ExamResult, Mark
+
+# Overridable in settings.py
+MAX_MARKS_PER_SUBJECT = getattr(settings, 'RESULTS_MAX_MARKS_PER_SUBJECT', 100)
+# (minimum percentage, grade), highest band first
+GRADE_BANDS = getattr(settings, 'RESULTS_GRADE_BANDS', [
+    (90, 'A+'), (80, 'A'), (70, 'B+'), (60, 'B'), (50, 'C'), (40, 'D'), (0, 'F'),
+])
+# 'min' gives 1, 2, 2, 4 for a tie; 'dense' gives 1, 2, 2, 3
+RANK_TIE_METHOD = getattr(settings, 'RESULTS_RANK_TIE_METHOD', 'min')
+RESULT_BATCH_SIZE = 2000
+
+
+def load_exam_marks(exam):
+    """One exam's marks as a DataFrame with one row per mark."""
+    import pandas as pd
+
+    rows = Mark.objects.filter(exam=exam).values_list(
+        'student_id', 'subject_id', 'marks_obtained',
+        'student__class_section_id', 'student__class_section__school_class_id',
+    ).iterator(chunk_size=10000)
+    return pd.DataFrame.from_records(rows, columns=['student', 'subject', 'marks', 'section', 'school_class'])
+
+
+def grade_for(percentages):
+    import numpy as np
+
+    thresholds = [threshold for threshold, _ in GRADE_BANDS]
+    grades = [grade for _, grade in GRADE_BANDS]
+    return np.select([percentages >= t for t in thresholds], grades, default=grades[-1])
+
+
+def rank_students(df):
+    """Vectorised totals, percentages, grades and ranks; one row per student."""
+    df['percentile'] = df.groupby('subject')['marks'].rank(method='max', pct=True).mul(100).round(1)
+    students = df.groupby('student').agg(
+        total=('marks', 'sum'),
+        subject_count=('marks', 'size'),
+        section=('section', 'first'),
+        school_class=('school_class', 'first'),
+    )
+    students['percentage'] = (students['total'] / (students['subject_count'] * MAX_MARKS_PER_SUBJECT) * 100).round(2)
+    students['grade'] = grade_for(students['percentage'])
+    by = students.groupby('section')['percentage']
+    students['section_rank'] = by.rank(method=RANK_TIE_METHOD, ascending=False).astype(int)
+    by = students.groupby('school_class')['percentage']
+    students['class_rank'] = by.rank(method=RANK_TIE_METHOD, ascending=False).astype(int)
+    return students
+
+
+def compute_exam_results(exam):
+    """Recompute and store ExamResult rows for one exam. Returns (students, seconds)."""
+    started = time.perf_counter()
+    df = load_exam_marks(exam)
+    if df.empty:
+        ExamResult.objects.filter(exam=exam).delete()
+        return 0, time.perf_counter() - started
+    students = rank_students(df)
+    percentiles = {}
+    ordered = df.sort_values('student')
+    for student_id, subject_id, percentile in zip(ordered['student'], ordered['subject'], ordered['percentile']):
+        percentiles.setdefault(student_id, {})[str(subject_id)] = float(percentile)
+    results = [
+        ExamResult(
+            exam=exam, student_id=int(student_id), class_section_id=int(row.section),
+            total=float(row.total), subject_count=int(row.subject_count), percentage=float(row.percentage),
+            grade=row.grade, section_rank=int(row.section_rank), class_rank=int(row.class_rank),
+            subject_percentiles=percentiles[student_id],
+        )
+        for student_id, row in zip(students.index, students.itertuples(index=False))
+    ]
+    with write_transaction():
+        ExamResult.objects.filter(exam=exam).delete()
+        ExamResult.objects.bulk_create(results, batch_size=RESULT_BATCH_SIZE)
+    return len(results), time.perf_counter() - started
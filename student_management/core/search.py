@@ -0,0 +1,87 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Student
+
+FTS_TABLE = 'core_student_fts'
+TYPEAHEAD_LIMIT = 10
+
+# FTS5 external-content index over core_student, kept in sync by triggers so
+# that bulk_create and raw SQL writes are indexed too.
+INSTALL_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, roll_number, guardian_name,
+        content='core_student', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON core_student BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, roll_number, guardian_name)
+        VALUES (new.id, new.name, new.roll_number, new.guardian_name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON core_student BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, roll_number, guardian_name)
+        VALUES ('delete', old.id, old.name, old.roll_number, old.guardian_name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON core_student BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, roll_number, guardian_name)
+        VALUES ('delete', old.id, old.name, old.roll_number, old.guardian_name);
+        INSERT INTO {FTS_TABLE}(rowid, name, roll_number, guardian_name)
+        VALUES (new.id, new.name, new.roll_number, new.guardian_name);
+    END""",
+]
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def install_search_index():
+    """Create the index and triggers if missing (a SQLite table rebuild drops triggers) and reindex."""
+    with connection.cursor() as cursor:
+        for sql in INSTALL_SQL:
+            cursor.execute(sql)
+        cursor.execute(REBUILD_SQL)
+
+
+def match_expression(text):
+    # Every word must match as a prefix; quoting keeps FTS operators out of user input
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+def _fallback_filter(text):
+    return (Q(name__icontains=text) | Q(roll_number__icontains=text) |
+            Q(guardian_name__icontains=text))
+
+
+def student_filter(text, field='pk'):
+    """Q restricting `field` (a Student id) to students matching `text`."""
+    expression = match_expression(text)
+    if not expression:
+        return Q()
+    if not fts_enabled():
+        return Q(**{f'{field}__in': Student.objects.filter(_fallback_filter(text)).values('pk')})
+    return Q(**{f'{field}__in': RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expression])})
+
+
+def search_students(text, limit=TYPEAHEAD_LIMIT):
+    """Best matches first: name hits weigh more than roll number, then guardian name."""
+    expression = match_expression(text)
+    if not expression:
+        return []
+    students = Student.objects.select_related('class_section__school_class', 'class_section__division')
+    if not fts_enabled():
+        return list(students.filter(_fallback_filter(text)).order_by('name')[:limit])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, 10.0, 5.0, 1.0) LIMIT %s',
+            [expression, limit],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    found = students.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
@@ -0,0 +1,236 @@
+import logging
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from . import analytics, auth, portal, stats, thumbnails
+from .models import Class, ClassSection, Exam, Mark, Student, Subject
+
+logger = logging.getLogger(__name__)
+
+# Sent after bulk mark writes that bypass Model.save()/delete(). `changes` is a
+# list of (student_id, exam_id, subject_id, old_value, new_value) tuples where
+# None stands for a missing mark.
+marks_bulk_changed = Signal()
+
+
+def _origin_model(origin):
+    return getattr(origin, 'model', type(origin))
+
+
+def _is_origin(instance, origin, model):
+    # Cascaded deletes are handled once by the object that started them
+    return origin is instance or _origin_model(origin) is model
+
+
+def _recomputes(origin):
+    # These deletes refresh statistics from the base tables once they are done
+    return _origin_model(origin) in (Class, ClassSection, Exam, Subject)
+
+
+# --- Marks ---
+
+@receiver(pre_save, sender=Mark)
+def remember_previous_mark(sender, instance, raw=False, **kwargs):
+    instance._previous_mark = None
+    if instance.pk and not raw:
+        instance._previous_mark = Mark.objects.filter(pk=instance.pk).values_list(
+            'student_id', 'marks_obtained').first()
+
+
+@receiver(post_save, sender=Mark)
+def update_stats_for_mark(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_mark', None)
+    changes = []
+    if previous and previous[0] != instance.student_id:
+        changes.append((previous[0], previous[1], None))
+        previous = None
+    changes.append((instance.student_id, previous[1] if previous else None, instance.marks_obtained))
+    stats.apply_mark_changes(changes)
+
+
+@receiver(post_delete, sender=Mark)
+def remove_mark_from_stats(sender, instance, origin=None, **kwargs):
+    if _is_origin(instance, origin, Mark):
+        stats.apply_mark_changes([(instance.student_id, instance.marks_obtained, None)])
+
+
+@receiver(marks_bulk_changed)
+def update_stats_for_bulk_marks(sender, changes, **kwargs):
+    stats.apply_mark_changes([(student_id, old, new) for student_id, _, _, old, new in changes])
+
+
+@receiver(post_save, sender=Mark)
+@receiver(post_delete, sender=Mark)
+def invalidate_results_for_mark(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_mark', None)
+    portal.invalidate_students([instance.student_id] + ([previous[0]] if previous else []))
+
+
+@receiver(marks_bulk_changed)
+def invalidate_results_for_bulk_marks(sender, changes, **kwargs):
+    portal.invalidate_students(change[0] for change in changes)
+
+
+# --- Students ---
+
+@receiver(pre_save, sender=Student)
+def remember_previous_student(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if instance.pk and not raw:
+        instance._previous_state = Student.objects.filter(pk=instance.pk).values(
+            'class_section__school_class_id', 'profile_photo', 'photo_thumbnail').first()
+
+
+@receiver(post_save, sender=Student)
+def update_stats_for_student(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    class_id = ClassSection.objects.filter(pk=instance.class_section_id).values_list(
+        'school_class_id', flat=True).first()
+    if created:
+        stats.adjust_class(class_id, students=1)
+        return
+    previous = getattr(instance, '_previous_state', None) or {}
+    previous_class_id = previous.get('class_section__school_class_id')
+    if previous_class_id != class_id:
+        count, total = stats.student_mark_totals(instance.pk)
+        stats.adjust_class(previous_class_id, students=-1, marks=-count, total=-total)
+        stats.adjust_class(class_id, students=1, marks=count, total=total)
+
+
+@receiver(post_save, sender=Student)
+def update_photo_thumbnails(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None) or {}
+    photo = instance.profile_photo.name if instance.profile_photo else None
+    if photo != (previous.get('profile_photo') or None) or (photo and not instance.photo_thumbnail):
+        try:
+            thumbnails.update_student_thumbnails(instance, previous.get('photo_thumbnail'))
+        except OSError:
+            # Unreadable upload: pages keep using the original file
+            logger.warning('Could not create thumbnails for student %s', instance.pk, exc_info=True)
+
+
+@receiver(pre_delete, sender=Student)
+def remember_deleted_student(sender, instance, origin=None, **kwargs):
+    # A Student delete, or one cascading from its User: account for the student and all its marks
+    if not _recomputes(origin):
+        instance._deleted_stats = (stats.class_of_student(instance.pk),) + stats.student_mark_totals(instance.pk)
+
+
+@receiver(post_delete, sender=Student)
+def remove_student_from_stats(sender, instance, origin=None, **kwargs):
+    deleted = getattr(instance, '_deleted_stats', None)
+    if deleted:
+        class_id, count, total = deleted
+        stats.adjust_class(class_id, students=-1, marks=-count, total=-total)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_cached_student_user(sender, instance, **kwargs):
+    auth.invalidate_users([instance.user_id])
+
+
+# --- Users ---
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    auth.invalidate_users([instance.pk])
+
+
+# --- Cascades from sections, exams and subjects ---
+
+@receiver(pre_save, sender=ClassSection)
+def remember_section_class(sender, instance, raw=False, **kwargs):
+    instance._previous_class_id = None
+    if instance.pk and not raw:
+        instance._previous_class_id = ClassSection.objects.filter(pk=instance.pk).values_list(
+            'school_class_id', flat=True).first()
+
+
+@receiver(post_save, sender=ClassSection)
+def refresh_stats_for_moved_section(sender, instance, created, raw=False, **kwargs):
+    previous_class_id = getattr(instance, '_previous_class_id', None)
+    if not raw and not created and previous_class_id != instance.school_class_id:
+        stats.refresh_classes([previous_class_id, instance.school_class_id])
+
+
+@receiver(post_delete, sender=ClassSection)
+def refresh_stats_for_deleted_section(sender, instance, origin=None, **kwargs):
+    if _origin_model(origin) is not Class:
+        stats.refresh_classes([instance.school_class_id])
+
+
+@receiver(post_delete, sender=Exam)
+@receiver(post_delete, sender=Subject)
+def refresh_stats_after_cascade(sender, instance, **kwargs):
+    stats.refresh_classes()
+
+
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_all_results(sender, instance, **kwargs):
+    # Names, dates and the latest exam appear on every student's results page
+    portal.invalidate_all_students()
+
+
+# Counts, charts and recent items on the staff dashboard
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Mark)
+@receiver(post_delete, sender=Mark)
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=ClassSection)
+@receiver(post_delete, sender=ClassSection)
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+def invalidate_dashboard(sender, instance, **kwargs):
+    stats.invalidate_dashboard()
+
+
+@receiver(marks_bulk_changed)
+def invalidate_dashboard_for_bulk_marks(sender, changes, **kwargs):
+    stats.invalidate_dashboard()
+
+
+# Per-exam distributions on the analytics page
+@receiver(post_save, sender=Mark)
+@receiver(post_delete, sender=Mark)
+def invalidate_analytics_for_mark(sender, instance, **kwargs):
+    analytics.invalidate_exams([instance.exam_id])
+
+
+@receiver(marks_bulk_changed)
+def invalidate_analytics_for_bulk_marks(sender, changes, **kwargs):
+    analytics.invalidate_exams({change[1] for change in changes})
+
+
+# Names, and which section a student's marks count towards
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=ClassSection)
+@receiver(post_delete, sender=ClassSection)
+def invalidate_all_analytics(sender, instance, **kwargs):
+    analytics.invalidate_all_exams()
+
+
+@receiver(post_save, sender=Class)
+def create_class_statistics(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.refresh_classes([instance.pk])
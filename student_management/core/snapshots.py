@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import time
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Exam, ExamResult, Mark, Student
+from .portal import group_marks, results_summary
+
+# <root>/CURRENT names the active snapshot; <root>/<id>/<user id>.json holds one
+# student's results payload. Snapshots are immutable once published.
+CURRENT = 'CURRENT'
+MANIFEST = 'manifest.json'
+
+_active = {'stat': None, 'snapshot': None}
+
+
+def snapshot_root():
+    return Path(getattr(settings, 'RESULTS_SNAPSHOT_ROOT', Path(settings.BASE_DIR) / 'snapshots'))
+
+
+def _write(path, payload):
+    path.write_text(json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')))
+
+
+def _standings(exam):
+    return {
+        row.pop('student_id'): dict(row, exam=exam.name)
+        for row in ExamResult.objects.filter(exam=exam).values(
+            'student_id', 'total', 'percentage', 'grade', 'section_rank', 'class_rank')
+    }
+
+
+def publish_snapshot(exam):
+    """
+    Render every student's results payload to files in one pass and make the new
+    snapshot active. Returns the manifest.
+    """
+    started = time.perf_counter()
+    root = snapshot_root()
+    snapshot_id = f'{exam.pk}-{time.time_ns()}'
+    build = root / f'.{snapshot_id}.tmp'
+    build.mkdir(parents=True)
+
+    users = dict(Student.objects.values_list('pk', 'user_id'))
+    student_count = len(users)
+    latest_exam = Exam.objects.order_by('-date', '-pk').values('id', 'name', 'date').first()
+    standings = _standings(exam)
+
+    def write(student_id, user_id, exam_results):
+        _write(build / f'{user_id}.json', {
+            'exam_results': exam_results,
+            'results_summary': results_summary(exam_results, latest_exam),
+            'standing': standings.get(student_id),
+        })
+
+    rows = Mark.objects.order_by(
+        'student_id', '-exam__date', 'exam_id', 'subject__name',
+    ).values_list('student_id', 'exam_id', 'exam__name', 'exam__date', 'subject__name', 'marks_obtained')
+    # One student's marks in memory at a time: each file is written as its group ends
+    for student_id, student_rows in groupby(rows.iterator(chunk_size=10000), key=itemgetter(0)):
+        user_id = users.pop(student_id, None)
+        if user_id is not None:
+            write(student_id, user_id, group_marks(row[1:] for row in student_rows))
+    # Students without any marks
+    for student_id, user_id in users.items():
+        write(student_id, user_id, [])
+
+    manifest = {
+        'id': snapshot_id,
+        'exam_id': exam.pk,
+        'exam_name': exam.name,
+        'students': student_count,
+        'published_at': time.time(),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+    _write(build / MANIFEST, manifest)
+    os.replace(build, root / snapshot_id)
+    _set_current(snapshot_id)
+    _remove_snapshots(keep=snapshot_id)
+    return manifest
+
+
+def _set_current(snapshot_id):
+    root = snapshot_root()
+    tmp = root / f'.{CURRENT}.tmp'
+    tmp.write_text(snapshot_id)
+    os.replace(tmp, root / CURRENT)
+
+
+def _remove_snapshots(keep=None):
+    root = snapshot_root()
+    if not root.exists():
+        return
+    for path in root.iterdir():
+        if path.is_dir() and path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def unpublish_snapshot():
+    """Go back to serving results from the database."""
+    (snapshot_root() / CURRENT).unlink(missing_ok=True)
+    _remove_snapshots()
+
+
+def active_snapshot():
+    """The active snapshot's manifest, or None. Re-read only when CURRENT is replaced."""
+    path = snapshot_root() / CURRENT
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (stat.st_ino, stat.st_mtime_ns)
+    if _active['stat'] != key:
+        try:
+            snapshot_id = path.read_text().strip()
+            manifest = json.loads((snapshot_root() / snapshot_id / MANIFEST).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        _active.update(stat=key, snapshot=manifest)
+    return _active['snapshot']
+
+
+def snapshot_path(user_id):
+    """File holding `user_id`'s published results, or None when no snapshot covers them."""
+    snapshot = active_snapshot()
+    if snapshot is None:
+        return None
+    path = snapshot_root() / snapshot['id'] / f'{user_id}.json'
+    return path if path.exists() else None
+
+
+def snapshot_etag(user_id):
+    # Snapshot files never change, so the snapshot id identifies the content
+    path = snapshot_path(user_id)
+    return f'{path.parent.name}-{user_id}' if path else None
+
+
+def load_student_results(user_id):
+    """Published results for `user_id`, shaped like portal.get_student_results(), or None."""
+    path = snapshot_path(user_id)
+    if path is None:
+        return None
+    try:
+        results = json.loads(path.read_text())
+    except FileNotFoundError:
+        # Replaced by a newer snapshot between the lookup and the read
+        return None
+    for result in results['exam_results']:
+        result['exam']['date'] = date.fromisoformat(result['exam']['date'])
+    if results['results_summary']:
+        summary = results['results_summary']
+        summary['exam_date'] = date.fromisoformat(summary['exam_date'])
+    return results
@@ -0,0 +1,126 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .cache_versions import aversion, bump, version
+from .models import Class, ClassStatistics, Mark, Student
+
+# Part of the dashboard's {% cache %} keys; bumped whenever what it shows may have changed
+DASHBOARD_VERSION_KEY = 'dashboard:version'
+
+
+def dashboard_version():
+    return version(DASHBOARD_VERSION_KEY)
+
+
+async def adashboard_version():
+    return await aversion(DASHBOARD_VERSION_KEY)
+
+
+def invalidate_dashboard():
+    transaction.on_commit(lambda: bump(DASHBOARD_VERSION_KEY))
+
+
+def adjust_class(class_id, students=0, marks=0, total=0.0):
+    if not (students or marks or total):
+        return
+    # The counters are unsigned, so a decrement past zero would fail the caller's save
+    updated = ClassStatistics.objects.filter(
+        school_class_id=class_id, student_count__gte=-students, mark_count__gte=-marks,
+    ).update(
+        student_count=F('student_count') + students,
+        mark_count=F('mark_count') + marks,
+        mark_total=F('mark_total') + total,
+    )
+    if not updated:
+        # No row yet, or the counters have drifted: rebuild from scratch, which already includes this change
+        refresh_classes([class_id])
+
+
+def class_of_student(student_id):
+    return Student.objects.filter(pk=student_id).values_list('class_section__school_class_id', flat=True).first()
+
+
+def student_mark_totals(student_id):
+    totals = Mark.objects.filter(student_id=student_id).aggregate(count=Count('id'), total=Sum('marks_obtained'))
+    return totals['count'], totals['total'] or 0.0
+
+
+def apply_mark_changes(changes):
+    """
+    Apply (student_id, old_value, new_value) changes, where None means the mark
+    did not exist before / no longer exists.
+    """
+    by_student = defaultdict(lambda: [0, 0.0])
+    for student_id, old, new in changes:
+        if old == new:
+            continue
+        delta = by_student[student_id]
+        delta[0] += (new is not None) - (old is not None)
+        delta[1] += (new or 0.0) - (old or 0.0)
+    if not by_student:
+        return
+    classes = dict(
+        Student.objects.filter(pk__in=by_student).values_list('id', 'class_section__school_class_id')
+    )
+    by_class = defaultdict(lambda: [0, 0.0])
+    for student_id, (count, total) in by_student.items():
+        class_id = classes.get(student_id)
+        if class_id is not None:
+            by_class[class_id][0] += count
+            by_class[class_id][1] += total
+    for class_id, (count, total) in by_class.items():
+        adjust_class(class_id, marks=count, total=total)
+
+
+def refresh_classes(class_ids=None):
+    """Recompute statistics from the base tables, for drift recovery and cascades."""
+    classes = Class.objects.all()
+    if class_ids is not None:
+        classes = classes.filter(pk__in=class_ids)
+    class_ids = list(classes.values_list('pk', flat=True))
+    students = dict(
+        Student.objects.filter(class_section__school_class_id__in=class_ids)
+        .values('class_section__school_class_id').annotate(count=Count('id'))
+        .values_list('class_section__school_class_id', 'count')
+    )
+    marks = {
+        row['student__class_section__school_class_id']: row
+        for row in Mark.objects.filter(student__class_section__school_class_id__in=class_ids)
+        .values('student__class_section__school_class_id')
+        .annotate(count=Count('id'), total=Sum('marks_obtained'))
+    }
+    invalidate_dashboard()
+    for class_id in class_ids:
+        row = marks.get(class_id, {})
+        ClassStatistics.objects.update_or_create(
+            school_class_id=class_id,
+            defaults={
+                'student_count': students.get(class_id, 0),
+                'mark_count': row.get('count', 0),
+                'mark_total': row.get('total') or 0.0,
+            },
+        )
+    return len(class_ids)
+
+
+def _dashboard_rows():
+    return ClassStatistics.objects.select_related('school_class').order_by('school_class__name')
+
+
+def dashboard_statistics():
+    return _summarise(list(_dashboard_rows()))
+
+
+async def adashboard_statistics():
+    return _summarise([row async for row in _dashboard_rows()])
+
+
+def _summarise(stats):
+    return {
+        'total_students': sum(s.student_count for s in stats),
+        'class_labels': [s.school_class.name for s in stats],
+        'class_counts': [s.student_count for s in stats],
+        'avg_scores': [s.average_mark for s in stats],
+    }
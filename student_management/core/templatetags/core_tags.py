@@ -0,0 +1,17 @@
+from django import template
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def student_photo(student, size='small', css_class=''):
+    """<picture> with the WebP thumbnail, a JPEG fallback, or the original photo."""
+    if not student.profile_photo:
+        return ''
+    if not student.photo_thumbnail:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">', student.profile_photo.url, student.name, css_class)
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp"><img src="{}" alt="{}" class="{}" loading="lazy"></picture>',
+        student.thumbnail_url(size, 'webp'), student.thumbnail_url(size, 'jpg'), student.name, css_class,
+    )
@@ -0,0 +1,45 @@
+import hashlib
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from django.template import TemplateSyntaxError
+from django.template.loader import get_template
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / 'templates'
+
+
+def template_names():
+    return sorted(path.relative_to(TEMPLATE_DIR).as_posix() for path in TEMPLATE_DIR.rglob('*.html'))
+
+
+@lru_cache(maxsize=None)
+def release_version():
+    """Changes whenever a template file does, so cached fragments never outlive a deploy."""
+    digest = hashlib.md5(usedforsecurity=False)
+    for name in template_names():
+        stat = (TEMPLATE_DIR / name).stat()
+        digest.update(f'{name}:{stat.st_mtime_ns}:{stat.st_size}'.encode())
+    return digest.hexdigest()[:12]
+
+
+def fragment_version(request):
+    """Context processor: the release part of every {% cache %} fragment key."""
+    return {'fragment_version': release_version()}
+
+
+def warm_templates():
+    """
+    Compile every core template into the cached loader of this process.
+    Returns (count, seconds, errors), errors being (name, exception) pairs.
+    """
+    started = time.perf_counter()
+    names = template_names()
+    errors = []
+    for name in names:
+        try:
+            get_template(name)
+        except TemplateSyntaxError as exc:
+            errors.append((name, exc))
+    release_version()
+    return len(names), time.perf_counter() - started, errors
@@ -1,3 +1,349 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import jobs
+from .apps import LOCMEM_CACHE
+from .exports import gradebook_rows, gradebook_subjects
+from .importers import MarkImporter, cell_date
+from .marks import read_mark_grid, save_student_marks, upsert_marks, valid_mark
+from .models import Class, ClassSection, ClassStatistics, Division, Exam, ExamResult, Job, Mark, Student, Subject
+from .onboarding import StudentOnboarding
+from .pagination import PAGE_SIZE, encode_cursor
+from .results import MAX_MARKS_PER_SUBJECT
+from .signals import marks_bulk_changed
+from .stats import dashboard_version, refresh_classes
+
+
+# Keep the shared on-disk cache of a development server out of the test database's way
+@override_settings(CACHES={'default': {'BACKEND': LOCMEM_CACHE}})
+class ExamResultsPaginationTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        self.exam = Exam.objects.create(name='Term 1', date=date(2024, 1, 1))
+        school_class = Class.objects.create(name='10')
+        results = []
+        for division_name in 'AB':
+            section = ClassSection.objects.create(
+                school_class=school_class, division=Division.objects.create(name=division_name))
+            for rank in range(1, PAGE_SIZE + 1):
+                user = User.objects.create(username=f'{division_name}{rank}')
+                student = Student.objects.create(
+                    user=user, name=f'Student {rank}', roll_number=str(rank), class_section=section)
+                results.append(ExamResult(
+                    exam=self.exam, student=student, class_section=section, total=0, subject_count=0,
+                    percentage=0, grade='F', section_rank=rank, class_rank=rank))
+        ExamResult.objects.bulk_create(results)
+
+    def test_next_page_cursor_on_section_ordering(self):
+        url = reverse('exam_results', args=[self.exam.pk])
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        page = first.context['page']
+        self.assertTrue(page.has_next)
+
+        second = self.client.get(url, {'after': page.next_cursor})
+        self.assertEqual(second.status_code, 200)
+        seen = [result.pk for result in page] + [result.pk for result in second.context['page']]
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), ExamResult.objects.count())
+
+        back = self.client.get(url, {'before': second.context['page'].prev_cursor})
+        self.assertEqual([result.pk for result in back.context['page']], [result.pk for result in page])
+
+    def test_malformed_section_filter_is_not_found(self):
+        response = self.client.get(reverse('exam_results', args=[self.exam.pk]), {'class_section': 'abc'})
+        self.assertEqual(response.status_code, 404)
+        section = ClassSection.objects.first()
+        response = self.client.get(reverse('exam_results', args=[self.exam.pk]), {'class_section': section.pk})
+        self.assertEqual(len(response.context['page']), PAGE_SIZE)
+        self.assertTrue(all(result.class_section_id == section.pk for result in response.context['page']))
+
+    def test_tampered_cursor_serves_first_page(self):
+        first = self.client.get(reverse('exam_results', args=[self.exam.pk]))
+        for values in (['abc'], [{'a': 1}], ['abc', 1, 2], [None, 1, 2], [[1], 1, 2]):
+            for name in ('after', 'before'):
+                response = self.client.get(reverse('exam_results', args=[self.exam.pk]), {name: encode_cursor(values)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['page']), list(first.context['page']))
+        for name in ('after', 'before'):
+            response = self.client.get(reverse('exam_list'), {name: encode_cursor(['notadate', 1])})
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(reverse('student_list'), {name: encode_cursor([{'a': 1}])})
+            self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES={'default': {'BACKEND': LOCMEM_CACHE}})
+class MarkImporterTests(TestCase):
+    def setUp(self):
+        section = ClassSection.objects.create(
+            school_class=Class.objects.create(name='10'), division=Division.objects.create(name='A'))
+        self.asha = Student.objects.create(
+            user=User.objects.create(username='asha'), name='Asha', roll_number='1', class_section=section)
+        # A name that looks like someone else's roll number
+        self.ravi = Student.objects.create(
+            user=User.objects.create(username='ravi'), name='1', roll_number='2', class_section=section)
+
+    def _import(self, *rows):
+        return MarkImporter().run(dict(row, Exam='Term 1', Subject='Maths') for row in rows)
+
+    def test_rejects_marks_out_of_range(self):
+        result = self._import(
+            {'Roll': '1', 'Marks': '-1'}, {'Roll': '1', 'Marks': '101'}, {'Roll': '1', 'Marks': 'inf'},
+            {'Roll': '1', 'Marks': '1e999'}, {'Roll': '1', 'Marks': 'nan'}, {'Roll': '1', 'Marks': 'abc'})
+        self.assertEqual([number for number, _ in result.rejected], [2, 3, 4, 5, 6, 7])
+        self.assertIn('from 0 to 100', result.rejected[0][1])
+        self.assertFalse(Mark.objects.exists())
+
+    def test_blank_roll_falls_back_to_name(self):
+        result = self._import(
+            {'Roll': '', 'Student': 'Asha', 'Marks': '40'},
+            {'Roll': '2', 'Student': 'Ravi', 'Marks': '50'},
+            {'Roll': '', 'Student': '1', 'Marks': '60'},
+            {'Roll': '', 'Student': 'Nobody', 'Marks': '70'})
+        self.assertEqual(result.imported, 2)
+        self.assertEqual(result.rejected, [(5, 'Unknown student "Nobody".')])
+        marks = dict(Mark.objects.values_list('student_id', 'marks_obtained'))
+        # Ravi's row by roll and the name "1" row both resolve to Ravi; the last one wins
+        self.assertEqual(marks, {self.asha.pk: 40, self.ravi.pk: 60})
+
+    def test_unchanged_marks_are_not_rewritten(self):
+        self.assertEqual(self._import({'Roll': '1', 'Marks': '40'}).imported, 1)
+        result = self._import({'Roll': '1', 'Marks': '40'}, {'Roll': '2', 'Marks': '45'})
+        self.assertEqual(result.imported, 1)
+        self.assertEqual(Exam.objects.count(), 1)
+        self.assertEqual(Subject.objects.count(), 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': LOCMEM_CACHE}})
+class DashboardVersionTests(TestCase):
+    def test_class_changes_refresh_dashboard(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            school_class = Class.objects.create(name='10')
+        before = dashboard_version()
+        school_class.name = '11'
+        with self.captureOnCommitCallbacks(execute=True):
+            school_class.save()
+        renamed = dashboard_version()
+        self.assertNotEqual(renamed, before)
+        with self.captureOnCommitCallbacks(execute=True):
+            school_class.delete()
+        self.assertNotEqual(dashboard_version(), renamed)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': LOCMEM_CACHE}},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class StudentOnboardingTests(TestCase):
+    def setUp(self):
+        ClassSection.objects.create(school_class=Class.objects.create(name='10'), division=Division.objects.create(name='A'))
+
+    def test_rejects_bad_email_and_date(self):
+        result = StudentOnboarding(workers=1, skip_invalid=True).run([
+            {'Name': 'Asha', 'Roll': '1', 'Section': '10A', 'Email': 'asha@example.com', 'Date of Birth': '2010-05-01'},
+            {'Name': 'Ravi', 'Roll': '2', 'Section': '10A', 'Email': 'not-an-address'},
+            {'Name': 'Meera', 'Roll': '3', 'Section': '10A', 'Date of Birth': 'May 2010'},
+            {'Name': 'Kiran', 'Roll': '4', 'Section': '10A', 'Date of Birth': ''},
+        ])
+        self.assertEqual(result.created, 2)
+        self.assertEqual([number for number, _ in result.rejected], [3, 4])
+        self.assertEqual(Student.objects.get(roll_number='1').date_of_birth, date(2010, 5, 1))
+        self.assertIsNone(Student.objects.get(roll_number='4').date_of_birth)
+
+    def test_cell_date(self):
+        self.assertIsNone(cell_date(None))
+        self.assertIsNone(cell_date('  '))
+        self.assertIsNone(cell_date(float('nan')))
+        self.assertEqual(cell_date(' 2024-01-02 '), date(2024, 1, 2))
+        with self.assertRaises(ValueError):
+            cell_date('soon')
+
+    def test_credentials_sheet_expires(self):
+        staff = User.objects.create_user('staff', password='x', is_staff=True)
+        job = Job.objects.create(kind='onboard_students', created_by=staff, status=Job.DONE, finished_at=timezone.now())
+        with tempfile.TemporaryDirectory() as root, mock.patch.object(jobs, 'JOB_ROOT', Path(root)):
+            path = jobs.result_path(job, 'credentials.csv')
+            path.write_text('secret')
+            job.save()
+            self.client.force_login(staff)
+            response = self.client.get(reverse('job_download', args=[job.pk]))
+            self.assertEqual(response.status_code, 200)
+            response.close()
+            Job.objects.filter(pk=job.pk).update(finished_at=timezone.now() - jobs.CREDENTIALS_TTL - timedelta(minutes=1))
+            self.assertEqual(self.client.get(reverse('job_download', args=[job.pk])).status_code, 404)
+            self.assertFalse(path.exists())
+            self.assertEqual(Job.objects.get(pk=job.pk).result_file, '')
+
+
+@override_settings(CACHES={'default': {'BACKEND': LOCMEM_CACHE}})
+class ClassStatisticsTests(TestCase):
+    """The incremental counters must always agree with a recount from the base tables."""
+
+    def setUp(self):
+        self.ten = Class.objects.create(name='10')
+        self.eleven = Class.objects.create(name='11')
+        division = Division.objects.create(name='A')
+        self.section = ClassSection.objects.create(school_class=self.ten, division=division)
+        self.other_section = ClassSection.objects.create(school_class=self.eleven, division=division)
+        self.exam = Exam.objects.create(name='Term 1', date=date(2024, 1, 1))
+        self.maths = Subject.objects.create(name='Maths')
+        self.science = Subject.objects.create(name='Science')
+        self.students = [self._student(roll) for roll in '123']
+
+    def _student(self, roll, section=None):
+        return Student.objects.create(
+            user=User.objects.create(username=f'student{roll}'), name=f'Student {roll}', roll_number=roll,
+            class_section=section or self.section)
+
+    def assertMatchesRecount(self):
+        def current():
+            return {row.school_class_id: (row.student_count, row.mark_count, round(row.mark_total, 6))
+                    for row in ClassStatistics.objects.all()}
+        incremental = current()
+        refresh_classes()
+        self.assertEqual(incremental, current())
+
+    def test_mark_changes(self):
+        mark = Mark.objects.create(student=self.students[0], exam=self.exam, subject=self.maths, marks_obtained=40)
+        Mark.objects.create(student=self.students[1], exam=self.exam, subject=self.maths, marks_obtained=60)
+        self.assertMatchesRecount()
+        mark.marks_obtained = 55
+        mark.save()
+        self.assertMatchesRecount()
+        mark.delete()
+        self.assertMatchesRecount()
+        self.assertEqual(ClassStatistics.objects.get(school_class=self.ten).mark_total, 60)
+
+    def test_student_changes(self):
+        for student in self.students:
+            Mark.objects.create(student=student, exam=self.exam, subject=self.maths, marks_obtained=50)
+        self._student('4')
+        self.assertMatchesRecount()
+        moved = self.students[0]
+        moved.class_section = self.other_section
+        moved.save()
+        self.assertMatchesRecount()
+        self.students[1].delete()
+        self.assertMatchesRecount()
+        # Deleting the account cascades to the Student and its marks
+        self.students[2].user.delete()
+        self.assertMatchesRecount()
+        self.assertEqual(ClassStatistics.objects.get(school_class=self.ten).student_count, 1)
+
+    def test_section_delete(self):
+        Mark.objects.create(student=self.students[0], exam=self.exam, subject=self.science, marks_obtained=70)
+        self.section.delete()
+        self.assertMatchesRecount()
+        self.assertEqual(ClassStatistics.objects.get(school_class=self.ten).student_count, 0)
+
+    def test_drifted_counters_are_rebuilt_instead_of_failing(self):
+        Mark.objects.create(student=self.students[0], exam=self.exam, subject=self.maths, marks_obtained=40)
+        ClassStatistics.objects.filter(school_class=self.ten).update(student_count=0, mark_count=0, mark_total=0)
+        self.students[0].delete()
+        self.assertMatchesRecount()
+        self.assertEqual(ClassStatistics.objects.get(school_class=self.ten).student_count, 2)
+
+
+@override_settings(CACHES={'default': {'BACKEND': LOCMEM_CACHE}})
+class MarkSavingTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        self.section = ClassSection.objects.create(
+            school_class=Class.objects.create(name='10'), division=Division.objects.create(name='A'))
+        self.maths = Subject.objects.create(name='Maths')
+        self.science = Subject.objects.create(name='Science')
+        self.section.subjects.add(self.maths, self.science)
+        self.exam = Exam.objects.create(name='Term 1', date=date(2024, 1, 1))
+        self.asha, self.ravi = (
+            Student.objects.create(user=User.objects.create(username=name), name=name.title(), roll_number=roll,
+                                   class_section=self.section)
+            for roll, name in (('1', 'asha'), ('2', 'ravi')))
+        self.changes = []
+        marks_bulk_changed.connect(self._record)
+        self.addCleanup(marks_bulk_changed.disconnect, self._record)
+
+    def _record(self, sender, changes, **kwargs):
+        self.changes.extend(changes)
+
+    def _marks(self):
+        return {(student_id, subject_id): value for student_id, subject_id, value in
+                Mark.objects.values_list('student_id', 'subject_id', 'marks_obtained')}
+
+    def test_upsert_writes_only_changed_rows(self):
+        key = (self.asha.pk, self.exam.pk, self.maths.pk)
+        self.assertEqual(upsert_marks([key + (40.0,)]), 1)
+        self.assertEqual(self.changes, [key + (None, 40.0)])
+        self.assertEqual(upsert_marks([key + (40.0,)]), 0)
+        self.assertEqual(len(self.changes), 1)
+        self.assertEqual(upsert_marks([key + (55.0,), (self.ravi.pk, self.exam.pk, self.maths.pk, 30.0)], batch_size=1), 2)
+        self.assertEqual(self.changes[1:], [key + (40.0, 55.0), (self.ravi.pk, self.exam.pk, self.maths.pk, None, 30.0)])
+        self.assertEqual(Mark.objects.count(), 2)
+
+    def test_save_student_marks_compares_with_stored_marks(self):
+        self.assertEqual(save_student_marks(self.asha, self.exam, {self.maths.pk: 40.0, self.science.pk: 50.0}), (2, 0))
+        self.assertEqual(save_student_marks(self.asha, self.exam, {self.maths.pk: 40.0, self.science.pk: 60.0}), (1, 1))
+        self.assertEqual(self.changes[-1], (self.asha.pk, self.exam.pk, self.science.pk, 50.0, 60.0))
+
+    def test_valid_mark(self):
+        for value in (0, 0.5, MAX_MARKS_PER_SUBJECT):
+            self.assertTrue(valid_mark(value))
+        for value in (None, -1, MAX_MARKS_PER_SUBJECT + 0.5, float('inf'), float('-inf'), float('nan')):
+            self.assertFalse(valid_mark(value))
+
+    def test_read_mark_grid(self):
+        values, errors = read_mark_grid({
+            'mark-1-1': ' 40 ', 'mark-1-2': '', 'mark-2-1': 'inf', 'mark-2-2': '101',
+        }, [1, 2], [1, 2])
+        self.assertEqual(values, {(1, 1): 40.0})
+        self.assertEqual(errors, {(2, 1): 'inf', (2, 2): '101'})
+
+    def test_section_grid_saves_nothing_when_a_cell_is_invalid(self):
+        url = reverse('section_marks_entry', args=[self.section.pk])
+        cell = f'mark-{self.asha.pk}-{self.maths.pk}'
+        response = self.client.post(url, {'exam': self.exam.pk, cell: '45', f'mark-{self.ravi.pk}-{self.maths.pk}': '1e999'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Mark.objects.exists())
+        response = self.client.post(url, {'exam': self.exam.pk, cell: '45'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self._marks(), {(self.asha.pk, self.maths.pk): 45.0})
+
+    def test_student_marks_api_validation(self):
+        url = reverse('student_marks_api', args=[self.asha.pk])
+        self.assertEqual(self.client.get(url, {'exam': 'abc'}).status_code, 400)
+        for payload in (
+            {'exam': 'x', 'marks': {}},
+            {'exam': self.exam.pk, 'marks': {str(self.maths.pk): MAX_MARKS_PER_SUBJECT + 1}},
+            {'exam': self.exam.pk, 'marks': {str(self.maths.pk): -1}},
+            {'exam': self.exam.pk, 'marks': {'9999': 10}},
+        ):
+            response = self.client.post(url, json.dumps(payload), content_type='application/json')
+            self.assertEqual(response.status_code, 400, payload)
+        response = self.client.post(url, '{"exam": %d, "marks": {"%d": Infinity}}' % (self.exam.pk, self.maths.pk),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Mark.objects.exists())
+        response = self.client.post(url, json.dumps({'exam': self.exam.pk, 'marks': {str(self.maths.pk): 70}}),
+                                    content_type='application/json')
+        self.assertEqual(response.json(), {'saved': 1, 'unchanged': 0, 'marks': {str(self.maths.pk): 70.0}})
+
+    def test_gradebook_rows(self):
+        for student, maths, science in ((self.asha, 40.0, 60.0), (self.ravi, 80.0, None)):
+            Mark.objects.create(student=student, exam=self.exam, subject=self.maths, marks_obtained=maths)
+            if science is not None:
+                Mark.objects.create(student=student, exam=self.exam, subject=self.science, marks_obtained=science)
+        marks = Mark.objects.filter(exam=self.exam)
+        subjects = gradebook_subjects(marks)
+        self.assertEqual([name for _, name in subjects], ['Maths', 'Science'])
+        self.assertEqual(list(gradebook_rows(marks, subjects)), [
+            ['10A', '1', 'Asha', 40.0, 60.0, 100.0, 50.0],
+            ['10A', '2', 'Ravi', 80.0, None, 80.0, 80.0],
+            ['10A', '', 'Section average', 60.0, 60.0, 90.0, 65.0],
+        ])
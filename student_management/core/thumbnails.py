@@ -0,0 +1,71 @@
+import hashlib
+import os
+import re
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Derivatives are written next to the original as <stem>.<content hash>.<size>.<webp|jpg>
+THUMBNAIL_SIZES = {
+    'small': (96, 96),
+    'medium': (320, 400),
+}
+FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+DERIVATIVE_PATTERN = re.compile(r'^[\w./-]+\.[0-9a-f]{12}\.(%s)\.(%s)$' % ('|'.join(THUMBNAIL_SIZES), '|'.join(FORMATS)))
+
+
+def derivative_key(photo_name, content):
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    path = PurePosixPath(photo_name)
+    return str(path.parent / f'{path.stem}.{digest}')
+
+
+def derivative_name(key, size, extension):
+    return f'{key}.{size}.{extension}'
+
+
+def derivative_url(key, size, extension):
+    # Served by core.views.cached_media with far-future cache headers
+    return f'{settings.MEDIA_URL}cached/{derivative_name(key, size, extension)}'
+
+
+def generate_derivatives(photo_name):
+    """Write every size/format for one stored photo. Returns the derivative key."""
+    with default_storage.open(photo_name, 'rb') as source:
+        content = source.read()
+    key = derivative_key(photo_name, content)
+    with Image.open(default_storage.path(photo_name)) as original:
+        original = ImageOps.exif_transpose(original).convert('RGB')
+        for size, dimensions in THUMBNAIL_SIZES.items():
+            image = ImageOps.fit(original, dimensions, Image.Resampling.LANCZOS)
+            for extension, image_format in FORMATS.items():
+                path = default_storage.path(derivative_name(key, size, extension))
+                if os.path.exists(path):
+                    continue
+                if image_format == 'WEBP':
+                    image.save(path, image_format, quality=82, method=4)
+                else:
+                    image.save(path, image_format, quality=85, optimize=True, progressive=True)
+    return key
+
+
+def delete_derivatives(key):
+    for size in THUMBNAIL_SIZES:
+        for extension in FORMATS:
+            name = derivative_name(key, size, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+
+
+def update_student_thumbnails(student, previous_key=None):
+    """(Re)build derivatives after the photo changed and record the key on the student."""
+    key = generate_derivatives(student.profile_photo.name) if student.profile_photo else None
+    students = type(student).objects
+    # update() keeps this out of the save signals that called us
+    students.filter(pk=student.pk).update(photo_thumbnail=key)
+    if previous_key and previous_key != key and not students.filter(photo_thumbnail=previous_key).exists():
+        delete_derivatives(previous_key)
+    student.photo_thumbnail = key
+    return key
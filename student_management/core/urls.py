@@ -1,22 +1,36 @@
+from django.conf import settings as django_settings
 from django.urls import path
 from .views import (
     dashboard,
     class_section_list, class_section_edit, class_section_delete, class_section_create, class_section_detail,
-    student_list, student_edit, student_delete, student_create,
+    student_list, student_edit, student_delete, student_create, student_search, student_onboard,
     teacher_list, teacher_edit, teacher_delete, teacher_create,
     subject_list, subject_edit, subject_delete, subject_create,
-    exam_list, exam_edit, exam_delete, exam_create,
+    exam_list, exam_edit, exam_delete, exam_create, exam_results, exam_publish, exam_gradebook,
+    exam_analytics, exam_analytics_json,
+    archived_exam_list, archived_exam_detail,
     mark_report,
     excel_upload,
+    job_list, job_detail, job_status, job_download,
     id_cards,
+    cached_media,
+    metrics,
     AdminLoginView,
     custom_logout_view,
     settings,
     manage_classes, manage_divisions,
     section_marks_entry,
     student_mark_entry,
+    student_marks_api,
+    home_view, student_results, student_results_json, student_profile_view,
 )
 
+if django_settings.ASYNC_VIEWS:
+    from .async_views import (  # noqa: F811
+        dashboard, home_view, student_results, student_results_json, mark_report,
+        class_section_list, student_list, teacher_list, subject_list, exam_list,
+    )
+
 urlpatterns = [
     path('admin/login/', AdminLoginView.as_view(), name='admin_login'),
     path('admin/logout/', custom_logout_view, name='admin_logout'),
@@ -29,6 +43,8 @@ urlpatterns = [
     path('class-sections/<int:pk>/delete/', class_section_delete, name='class_section_delete'),
     path('students/', student_list, name='student_list'),
     path('students/add/', student_create, name='student_create'),
+    path('students/onboard/', student_onboard, name='student_onboard'),
+    path('students/search/', student_search, name='student_search'),
     path('students/<int:pk>/edit/', student_edit, name='student_edit'),
     path('students/<int:pk>/delete/', student_delete, name='student_delete'),
     path('teachers/', teacher_list, name='teacher_list'),
@@ -43,9 +59,21 @@ urlpatterns = [
     path('exams/add/', exam_create, name='exam_create'),
     path('exams/<int:pk>/edit/', exam_edit, name='exam_edit'),
     path('exams/<int:pk>/delete/', exam_delete, name='exam_delete'),
+    path('exams/<int:pk>/results/', exam_results, name='exam_results'),
+    path('exams/<int:pk>/publish/', exam_publish, name='exam_publish'),
+    path('exams/<int:pk>/gradebook/', exam_gradebook, name='exam_gradebook'),
+    path('exams/<int:pk>/analytics/', exam_analytics, name='exam_analytics'),
+    path('exams/<int:pk>/analytics.json', exam_analytics_json, name='exam_analytics_json'),
+    path('archive/', archived_exam_list, name='archived_exam_list'),
+    path('archive/<int:pk>/', archived_exam_detail, name='archived_exam_detail'),
     path('reports/marks/', mark_report, name='mark_report'),
     path('upload/excel/', excel_upload, name='excel_upload'),
+    path('jobs/', job_list, name='job_list'),
+    path('jobs/<int:pk>/', job_detail, name='job_detail'),
+    path('jobs/<int:pk>/status/', job_status, name='job_status'),
+    path('jobs/<int:pk>/download/', job_download, name='job_download'),
     path('id-cards/', id_cards, name='id_cards'),
+    path(f"{django_settings.MEDIA_URL.lstrip('/')}cached/<path:path>", cached_media, name='cached_media'),
     path('settings/', settings, name='settings'),
     path('manage/classes/', manage_classes, name='manage_classes'),
     path('manage/divisions/', manage_divisions, name='manage_divisions'),
@@ -58,4 +86,10 @@ urlpatterns = [
     path('exams/<int:pk>/delete/', exam_delete, name='delete-exam'),
     path('sections/<int:section_id>/marks-entry/', section_marks_entry, name='section_marks_entry'),
     path('students/<int:student_id>/mark-entry/', student_mark_entry, name='student_mark_entry'),
+    path('students/<int:student_id>/marks/', student_marks_api, name='student_marks_api'),
+    path('student/', home_view, name='student-home'),
+    path('student/results/', student_results, name='student-results'),
+    path('student/results.json', student_results_json, name='student-results-json'),
+    path('student/profile/', student_profile_view, name='student-profile'),
+    path('metrics/', metrics, name='metrics'),
 ]
@@ -1,13 +1,36 @@
+import json
+from datetime import date
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse
-from .models import Student, Mark, Exam, Subject, Division, ClassSection, Teacher, Class
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.static import serve
+from .models import Student, Mark, Exam, ExamResult, Subject, Division, ClassSection, Teacher, Class, Job, ArchivedExam
 from .forms import ExamForm, StudentForm, SubjectForm, DivisionForm, MarkForm, ClassSectionForm, TeacherForm, ClassForm, UserForm, StudentProfileForm, StudentMarksEntryForm
 from django.contrib.auth import logout
+from .analytics import get_exam_analytics
+from .archive import purge_class_section, purge_exam
+from .database import write_transaction
 from .decorators import student_required, admin_required
+from .exports import filter_marks, gradebook_xlsx, stream_archived_marks_csv, stream_gradebook_csv
+from .importers import UPLOAD_EXTENSIONS
+from .jobs import CREDENTIALS_TTL, credentials_expired, enqueue, purge_credentials, result_file_path, save_upload
+from .metrics import registry
+from .marks import read_mark_grid, save_student_marks, section_marks, student_marks, upsert_marks, valid_mark
+from .stats import dashboard_statistics, dashboard_version
+from .thumbnails import DERIVATIVE_PATTERN
+from .pagination import keyset_paginate
+from .portal import get_student_results
+from .results import MAX_MARKS_PER_SUBJECT, compute_exam_results
+from .search import search_students, student_filter
+from .snapshots import active_snapshot, load_student_results, publish_snapshot, snapshot_etag, snapshot_path, unpublish_snapshot
 from django.contrib.auth import views as auth_views
+from django.contrib.auth.views import redirect_to_login
 from django.urls import reverse
+from django.utils.text import slugify
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.views import View
 from django import forms
@@ -17,6 +40,7 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils.decorators import method_decorator
 from django.db.models import Count, Avg
 from django.db import transaction
+from django.conf import settings as django_settings
 
 def custom_logout_view(request):
     logout(request)
@@ -24,48 +48,38 @@ def custom_logout_view(request):
 
 
 
+def _results_for(request):
+    # While a results-day snapshot is active, only authentication touches the database
+    results = load_student_results(request.user.pk)
+    if results is None:
+        try:
+            student = request.user.student_profile
+        except Student.DoesNotExist:
+            return None
+        results = get_student_results(student.pk)
+    return results
+
+
+def _results_etag(request):
+    return snapshot_etag(request.user.pk) if request.user.is_authenticated else None
+
+
 @student_required
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_results_etag)
 def home_view(request):
     # Always show student dashboard or login page
     if not request.user.is_authenticated:
         return redirect('/login/')
-    try:
-        student = request.user.student
-    except Student.DoesNotExist:
+    # Marks grouped by exam plus the latest-exam summary, from the snapshot or results cache
+    results = _results_for(request)
+    if results is None:
         return redirect('/login/')
 
-    # ✅ Fetch marks grouped by exam
-    marks = Mark.objects.filter(student=student).select_related('exam', 'subject')
-
-    exam_results = {}
-    for mark in marks:
-        exam = mark.exam
-        if exam not in exam_results:
-            exam_results[exam] = []
-        exam_results[exam].append(mark)
-
-    # --- Results Summary logic ---
-    latest_exam = Exam.objects.order_by('-date').first()
-    results_summary = None
-    if latest_exam:
-        latest_marks = Mark.objects.filter(student=student, exam=latest_exam)
-        if latest_marks.exists():
-            avg_score = sum(m.marks_obtained for m in latest_marks) / latest_marks.count()
-            results_summary = {
-                'exam_name': latest_exam.name,
-                'exam_date': latest_exam.date,
-                'average_score': round(avg_score, 2),
-            }
-
-    # To get all subjects for the student's class:
-    subjects = student.class_division.student_class.subjects.all()
-    # (student_class is now a SchoolClass instance)
-
     return render(request, 'core/student_dashboard.html', {
-        'student': student,
-        'exam_results': exam_results,
-        'results_summary': results_summary,
+        'exam_results': results['exam_results'],
+        'results_summary': results['results_summary'],
     })
 
 
@@ -73,7 +87,7 @@ def home_view(request):
 @login_required
 def student_profile_view(request):
     try:
-        student = request.user.student
+        student = request.user.student_profile
     except Student.DoesNotExist:
         return HttpResponse("Student profile not found. Please contact the administrator.")
 
@@ -94,25 +108,36 @@ def student_profile_view(request):
 
 @student_required
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_results_etag)
 def student_results(request):
-    try:
-        student = request.user.student
-    except Student.DoesNotExist:
+    results = _results_for(request)
+    if results is None:
         return HttpResponse("Student profile not found. Please contact the administrator.")
 
-    marks = Mark.objects.filter(student=student).select_related('exam', 'subject')
-    exam_results = {}
-    for mark in marks:
-        exam = mark.exam
-        if exam not in exam_results:
-            exam_results[exam] = []
-        exam_results[exam].append(mark)
-
     return render(request, 'core/student_results.html', {
-        'exam_results': exam_results,
+        'exam_results': results['exam_results'],
+        'standing': results.get('standing'),
     })
 
 
+@student_required
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_results_etag)
+def student_results_json(request):
+    path = snapshot_path(request.user.pk)
+    if path is not None:
+        try:
+            return HttpResponse(path.read_bytes(), content_type='application/json')
+        except FileNotFoundError:
+            pass
+    results = _results_for(request)
+    if results is None:
+        return JsonResponse({'error': 'Student profile not found.'}, status=404)
+    return JsonResponse(results)
+
+
 class StudentLoginForm(forms.Form):
     username = forms.CharField()
     password = forms.CharField(widget=forms.PasswordInput)
@@ -189,20 +214,20 @@ def reports_view(request):
 @login_required(login_url='/admin/login/')
 @user_passes_test(lambda u: u.is_staff, login_url='/admin/login/')
 def dashboard(request):
+    # Student counts and mark averages come from the ClassStatistics store. Everything
+    # is lazy (callables and querysets), so nothing runs while the cached fragments are fresh.
     context = {
-        'total_students': Student.objects.count(),
-        'total_exams': Exam.objects.count(),
-        'total_subjects': Subject.objects.count(),
-        'total_classdivs': ClassSection.objects.count(),
+        'dashboard_version': dashboard_version(),
+        'class_statistics': dashboard_statistics,
+        'total_exams': Exam.objects.count,
+        'total_subjects': Subject.objects.count,
+        'total_classdivs': ClassSection.objects.count,
         'recent_students': Student.objects.order_by('-id')[:5],
         'recent_exams': Exam.objects.order_by('-date')[:5],
-        'recent_marks': Mark.objects.order_by('-id')[:5],
+        'recent_marks': Mark.objects.select_related('student', 'subject').order_by('-id')[:5],
         'upcoming_exams': Exam.objects.order_by('date')[:5],
-        'class_labels': list(ClassSection.objects.values_list('school_class__name', flat=True).distinct()),
-        'class_counts': list(ClassSection.objects.values('school_class__name').annotate(count=Count('student')).values_list('count', flat=True)),
-        'avg_scores': list(Mark.objects.values('student__class_section__school_class__name').annotate(avg=Avg('marks_obtained')).values_list('avg', flat=True)),
     }
-    return render(request, 'core/dashboardbase.html', context)
+    return render(request, 'core/admin_dashboard.html', context)
 
 # --- List all ClassSections ---
 def class_section_list(request):
@@ -241,8 +266,8 @@ def class_section_edit(request, pk):
 def class_section_delete(request, pk):
     section = get_object_or_404(ClassSection, pk=pk)
     if request.method == 'POST':
-        section.delete()
-        messages.success(request, 'Class section deleted successfully.')
+        marks = purge_class_section(section)
+        messages.success(request, f'Class section deleted successfully, with {marks} marks.')
         return redirect('class_section_list')
     return render(request, 'core/class_section_delete.html', {'section': section})
 
@@ -256,38 +281,76 @@ def class_section_detail(request, pk):
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def section_marks_entry(request, section_id):
-    section = get_object_or_404(ClassSection, pk=section_id)
-    students = Student.objects.filter(class_section=section)
-    subjects = section.subjects.all()
+    section = get_object_or_404(ClassSection.objects.select_related('school_class', 'division'), pk=section_id)
+    students = list(Student.objects.filter(class_section=section).order_by('roll_number', 'pk').only('id', 'name', 'roll_number'))
+    subjects = list(section.subjects.order_by('name'))
     exams = Exam.objects.all()
     selected_exam_id = request.POST.get('exam') or request.GET.get('exam')
     selected_exam = None
     if selected_exam_id:
         selected_exam = get_object_or_404(Exam, pk=selected_exam_id)
-    MarkFormSet = forms.modelformset_factory(Mark, form=MarkForm, extra=0, can_delete=False)
-    initial_data = []
+    rows = []
+    errors = {}
     if selected_exam:
+        existing = section_marks(section, selected_exam)
+        student_ids = [s.pk for s in students]
+        subject_ids = [s.pk for s in subjects]
+        submitted = {}
+        if request.method == 'POST':
+            submitted, errors = read_mark_grid(request.POST, student_ids, subject_ids)
+            if not errors:
+                with write_transaction():
+                    # Compare against the marks as they are now, not as this request first read them
+                    current = section_marks(section, selected_exam)
+                    changed = [
+                        (student_id, selected_exam.pk, subject_id, value)
+                        for (student_id, subject_id), value in submitted.items()
+                        if current.get((student_id, subject_id)) != value
+                    ]
+                    saved = upsert_marks(changed, previous={
+                        (student_id, selected_exam.pk, subject_id): value
+                        for (student_id, subject_id), value in current.items()
+                    })
+                messages.success(request, f'Marks saved successfully ({saved} changed).')
+                return redirect(f"{reverse('section_marks_entry', args=[section.pk])}?exam={selected_exam.pk}")
+            messages.error(request, f'Some marks are not numbers from 0 to {MAX_MARKS_PER_SUBJECT}. Nothing was saved.')
+            submitted.update(errors)
         for student in students:
+            cells = []
             for subject in subjects:
-                initial_data.append({'student': student, 'subject': subject, 'exam': selected_exam})
-    if request.method == 'POST' and selected_exam:
-        formset = MarkFormSet(request.POST, queryset=Mark.objects.none(), initial=initial_data)
-        if formset.is_valid():
-            formset.save()
-            messages.success(request, 'Marks saved successfully.')
-            return redirect('class_section_detail', pk=section.pk)
-    else:
-        formset = MarkFormSet(queryset=Mark.objects.none(), initial=initial_data)
+                key = (student.pk, subject.pk)
+                cells.append({
+                    'name': f'mark-{student.pk}-{subject.pk}',
+                    'value': submitted.get(key, existing.get(key, '')),
+                    'error': key in errors,
+                })
+            rows.append({'student': student, 'cells': cells})
     return render(request, 'core/section_marks_entry.html', {
         'section': section,
         'students': students,
+        'subjects': subjects,
+        'rows': rows,
         'exams': exams,
         'selected_exam': selected_exam,
     })
 
 def student_list(request):
-    students = Student.objects.select_related('class_section').all()
-    return render(request, 'core/student_list.html', {'students': students})
+    students = Student.objects.select_related('class_section__school_class', 'class_section__division')
+    query = request.GET.get('q', '')
+    if query:
+        students = students.filter(student_filter(query))
+    page = keyset_paginate(students, request)
+    return render(request, 'core/student_list.html', {'students': page, 'page': page, 'query': query})
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def student_search(request):
+    # Type-ahead lookups for the student filters
+    students = search_students(request.GET.get('q', ''))
+    return JsonResponse({'results': [
+        {'id': s.pk, 'name': s.name, 'roll_number': s.roll_number, 'class_section': str(s.class_section)}
+        for s in students
+    ]})
 
 @login_required
 @user_passes_test(lambda u: u.is_staff)
@@ -310,6 +373,19 @@ def student_create(request):
         student_form = StudentForm()
     return render(request, 'core/student_form.html', {'user_form': user_form, 'student_form': student_form})
 
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def student_onboard(request):
+    if request.method == 'POST' and request.FILES.get('student_file'):
+        student_file = request.FILES['student_file']
+        if not student_file.name.lower().endswith(UPLOAD_EXTENSIONS):
+            messages.error(request, 'Upload an .xlsx workbook or a .csv file.')
+            return redirect('student_onboard')
+        job = enqueue('onboard_students', request.user, upload=save_upload(student_file),
+                      upload_name=student_file.name, skip_invalid=bool(request.POST.get('skip_invalid')))
+        return redirect('job_detail', pk=job.pk)
+    return render(request, 'core/student_onboard.html')
+
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def student_edit(request, pk):
@@ -349,8 +425,8 @@ def student_delete(request, pk):
     return render(request, 'core/student_delete.html', {'student': student})
 
 def teacher_list(request):
-    teachers = Teacher.objects.all()
-    return render(request, 'core/teacher_list.html', {'teachers': teachers})
+    page = keyset_paginate(Teacher.objects.all(), request)
+    return render(request, 'core/teacher_list.html', {'teachers': page, 'page': page})
 
 @login_required
 @user_passes_test(lambda u: u.is_staff)
@@ -390,8 +466,8 @@ def teacher_delete(request, pk):
     return render(request, 'core/teacher_delete.html', {'teacher': teacher})
 
 def subject_list(request):
-    subjects = Subject.objects.all()
-    return render(request, 'core/subject_list.html', {'subjects': subjects})
+    page = keyset_paginate(Subject.objects.all(), request)
+    return render(request, 'core/subject_list.html', {'subjects': page, 'page': page})
 
 @login_required
 @user_passes_test(lambda u: u.is_staff)
@@ -431,8 +507,8 @@ def subject_delete(request, pk):
     return render(request, 'core/subject_delete.html', {'subject': subject})
 
 def exam_list(request):
-    exams = Exam.objects.all()
-    return render(request, 'core/exam_list.html', {'exams': exams})
+    page = keyset_paginate(Exam.objects.all(), request, ordering=('-date', '-pk'))
+    return render(request, 'core/exam_list.html', {'exams': page, 'page': page})
 
 @login_required
 @user_passes_test(lambda u: u.is_staff)
@@ -466,64 +542,239 @@ def exam_edit(request, pk):
 def exam_delete(request, pk):
     exam = get_object_or_404(Exam, pk=pk)
     if request.method == 'POST':
-        exam.delete()
-        messages.success(request, 'Exam deleted successfully.')
+        if request.POST.get('action') == 'archive':
+            job = enqueue('archive_exams', request.user, exam_ids=[exam.pk])
+            return redirect('job_detail', pk=job.pk)
+        marks = purge_exam(exam)
+        messages.success(request, f'Exam deleted successfully, with {marks} marks.')
         return redirect('exam_list')
-    return render(request, 'core/exam_delete.html', {'exam': exam})
+    return render(request, 'core/exam_delete.html', {'exam': exam, 'mark_count': Mark.objects.filter(exam=exam).count()})
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def archived_exam_list(request):
+    if request.method == 'POST':
+        before = request.POST.get('before', '')
+        try:
+            date.fromisoformat(before)
+        except ValueError:
+            messages.error(request, 'Enter a date as YYYY-MM-DD.')
+            return redirect('archived_exam_list')
+        job = enqueue('archive_exams', request.user, before=before)
+        return redirect('job_detail', pk=job.pk)
+    page = keyset_paginate(ArchivedExam.objects.all(), request, ordering=('-date', '-pk'))
+    return render(request, 'core/archived_exam_list.html', {'archived_exams': page, 'page': page})
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def archived_exam_detail(request, pk):
+    archived = get_object_or_404(ArchivedExam, pk=pk)
+    marks = archived.marks.all()
+    section = request.GET.get('class_section', '')
+    if section:
+        marks = marks.filter(class_section=section)
+    if request.GET.get('format') == 'csv':
+        return stream_archived_marks_csv(marks, f'{slugify(archived.name) or "exam"}-{archived.date}-archive.csv')
+    averages = archived.marks.values('class_section', 'subject').annotate(
+        average=Avg('marks_obtained'), count=Count('id')).order_by('class_section', 'subject')
+    page = keyset_paginate(marks, request, ordering=('class_section', 'roll_number', 'pk'))
+    return render(request, 'core/archived_exam_detail.html', {
+        'archived': archived,
+        'marks': page,
+        'page': page,
+        'averages': averages,
+        'sections': archived.marks.values_list('class_section', flat=True).distinct().order_by('class_section'),
+        'section': section,
+    })
 
 def mark_report(request):
-    marks = Mark.objects.select_related('student', 'exam', 'subject')
+    marks = filter_marks(
+        Mark.objects.select_related('student', 'exam', 'subject'),
+        student=request.GET.get('student', ''), exam=request.GET.get('exam', ''), subject=request.GET.get('subject', ''),
+    )
     exams = Exam.objects.all()
     subjects = Subject.objects.all()
     student_query = request.GET.get('student', '')
-    exam_id = request.GET.get('exam', '')
-    subject_id = request.GET.get('subject', '')
-    if student_query:
-        marks = marks.filter(student__name__icontains=student_query)
-    if exam_id:
-        marks = marks.filter(exam_id=exam_id)
-    if subject_id:
-        marks = marks.filter(subject_id=subject_id)
     if request.GET.get('export') == 'csv':
-        import csv
-        from django.http import HttpResponse
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="mark_report.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Student', 'Exam', 'Subject', 'Marks'])
-        for mark in marks:
-            writer.writerow([mark.student.name, mark.exam.name, mark.subject.name, mark.marks_obtained])
-        return response
-    return render(request, 'core/mark_report.html', {'marks': marks, 'exams': exams, 'subjects': subjects})
+        # Written by the job worker; the download belongs to the staff user who asked for it
+        if not request.user.is_staff:
+            return redirect_to_login(request.get_full_path(), '/admin/login/')
+        job = enqueue('export_marks_csv', request.user, student=student_query,
+                      exam=request.GET.get('exam', ''), subject=request.GET.get('subject', ''))
+        return redirect('job_detail', pk=job.pk)
+    page = keyset_paginate(marks, request)
+    return render(request, 'core/mark_report.html', {
+        'marks': page, 'page': page, 'exams': exams, 'subjects': subjects, 'student_query': student_query,
+    })
 
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def excel_upload(request):
-    import io
-    import pandas as pd
     if request.method == 'POST' and request.FILES.get('excel_file'):
         excel_file = request.FILES['excel_file']
-        df = pd.read_excel(excel_file)
-        for _, row in df.iterrows():
-            student, _ = Student.objects.get_or_create(name=row['Student'])
-            exam, _ = Exam.objects.get_or_create(name=row['Exam'])
-            subject, _ = Subject.objects.get_or_create(name=row['Subject'])
-            Mark.objects.update_or_create(
-                student=student, exam=exam, subject=subject,
-                defaults={'marks_obtained': row['Marks']}
-            )
-        messages.success(request, 'Excel uploaded and marks imported.')
+        if not excel_file.name.lower().endswith(UPLOAD_EXTENSIONS):
+            messages.error(request, 'Upload an .xlsx workbook or a .csv file.')
+            return redirect('excel_upload')
+        job = enqueue('import_marks', request.user, upload=save_upload(excel_file), upload_name=excel_file.name)
+        return redirect('job_detail', pk=job.pk)
     return render(request, 'core/excel_upload.html')
 
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def id_cards(request):
-    sections = ClassSection.objects.all()
+    sections = ClassSection.objects.select_related('school_class', 'division')
     students = []
     section_id = request.GET.get('class_section')
+    if request.GET.get('format') == 'pdf':
+        # Print-ready sheets, rendered by the job worker; 'all' covers the whole school
+        if section_id and section_id != 'all':
+            section_id = get_object_or_404(ClassSection, pk=section_id).pk
+        job = enqueue('id_card_pdf', request.user, class_section=section_id or 'all')
+        return redirect('job_detail', pk=job.pk)
     if section_id:
         students = Student.objects.filter(class_section_id=section_id)
-    return render(request, 'core/id_cards.html', {'sections': sections, 'students': students})
+    return render(request, 'core/id_cards.html', {'sections': sections, 'students': students, 'section_id': section_id})
+
+def _jobs_for(user):
+    jobs = Job.objects.select_related('created_by')
+    return jobs if user.is_superuser else jobs.filter(created_by=user)
+
+def _job_status(job):
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'percent': job.percent,
+        'message': job.message,
+        'error': job.error if job.status == Job.FAILED else '',
+        'download_url': reverse('job_download', args=[job.pk]) if job.result_file and job.status == Job.DONE else None,
+    }
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def job_list(request):
+    page = keyset_paginate(_jobs_for(request.user), request, ordering=('-pk',))
+    return render(request, 'core/job_list.html', {'jobs': page, 'page': page})
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def job_detail(request, pk):
+    job = get_object_or_404(_jobs_for(request.user), pk=pk)
+    return render(request, 'core/job_detail.html', {
+        'job': job, 'status': _job_status(job), 'credentials_minutes': int(CREDENTIALS_TTL.total_seconds() // 60),
+    })
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def job_status(request, pk):
+    # Polled by the job page until the job finishes
+    job = get_object_or_404(_jobs_for(request.user), pk=pk)
+    return JsonResponse(_job_status(job))
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def job_download(request, pk):
+    job = get_object_or_404(_jobs_for(request.user), pk=pk, status=Job.DONE)
+    if credentials_expired(job):
+        # run_jobs purges these on its own schedule; never hand one out late
+        purge_credentials()
+        raise Http404('This download has expired.')
+    path = result_file_path(job)
+    if path is None or not path.exists():
+        raise Http404('This download has expired.')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def exam_results(request, pk):
+    exam = get_object_or_404(Exam, pk=pk)
+    if request.method == 'POST':
+        count, seconds = compute_exam_results(exam)
+        messages.success(request, f'Computed results for {count} students in {seconds:.1f}s.')
+        return redirect('exam_results', pk=exam.pk)
+    results = ExamResult.objects.filter(exam=exam).select_related(
+        'student', 'class_section__school_class', 'class_section__division')
+    section_id = request.GET.get('class_section', '')
+    if section_id:
+        try:
+            int(section_id)
+        except ValueError:
+            raise Http404('No such class section.')
+        results = results.filter(class_section_id=section_id)
+    page = keyset_paginate(results, request, ordering=('class_section', 'section_rank', 'pk'))
+    return render(request, 'core/exam_results.html', {
+        'exam': exam,
+        'results': page,
+        'page': page,
+        'sections': ClassSection.objects.select_related('school_class', 'division'),
+        'section_id': section_id,
+        'snapshot': active_snapshot(),
+    })
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def exam_analytics(request, pk):
+    exam = get_object_or_404(Exam, pk=pk)
+    return render(request, 'core/exam_analytics.html', {'exam': exam, 'analytics': get_exam_analytics(exam)})
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def exam_analytics_json(request, pk):
+    return JsonResponse(get_exam_analytics(get_object_or_404(Exam, pk=pk)))
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def exam_gradebook(request, pk):
+    # Student x subject matrix for one section, one class or (by default) the whole school
+    exam = get_object_or_404(Exam, pk=pk)
+    marks = Mark.objects.filter(exam=exam)
+    scope = 'all'
+    for param in ('class_section', 'school_class'):
+        if request.GET.get(param):
+            try:
+                int(request.GET[param])
+            except ValueError:
+                raise Http404(f'No such {param.replace("_", " ")}.')
+    if request.GET.get('class_section'):
+        section = get_object_or_404(ClassSection.objects.select_related('school_class', 'division'), pk=request.GET['class_section'])
+        marks = marks.filter(student__class_section=section)
+        scope = str(section)
+    elif request.GET.get('school_class'):
+        school_class = get_object_or_404(Class, pk=request.GET['school_class'])
+        marks = marks.filter(student__class_section__school_class=school_class)
+        scope = f'class-{school_class.name}'
+    filename = f'gradebook-{slugify(exam.name)}-{slugify(scope)}'
+    if request.GET.get('format') == 'csv':
+        return stream_gradebook_csv(marks, f'{filename}.csv')
+    return gradebook_xlsx(marks, f'{filename}.xlsx', title=f'{exam.name} {scope}')
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def exam_publish(request, pk):
+    exam = get_object_or_404(Exam, pk=pk)
+    if request.method == 'POST':
+        if request.POST.get('action') == 'unpublish':
+            unpublish_snapshot()
+            messages.success(request, 'Snapshot withdrawn; student results are served live again.')
+        else:
+            manifest = publish_snapshot(exam)
+            messages.success(request, f"Published results for {manifest['students']} students in {manifest['seconds']}s.")
+    return redirect('exam_results', pk=exam.pk)
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def metrics(request):
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def cached_media(request, path):
+    # Thumbnail names carry a content hash, so they can be cached forever
+    if not DERIVATIVE_PATTERN.match(path):
+        raise Http404
+    response = serve(request, path, document_root=django_settings.MEDIA_ROOT)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 @login_required
 @user_passes_test(lambda u: u.is_staff)
@@ -565,9 +816,9 @@ def manage_divisions(request):
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def student_mark_entry(request, student_id):
-    student = get_object_or_404(Student, pk=student_id)
+    student = get_object_or_404(Student.objects.select_related('class_section'), pk=student_id)
     section = student.class_section
-    subjects = section.subjects.all()
+    subjects = list(section.subjects.all())
     exams = Exam.objects.all()
     selected_exam_id = request.GET.get('exam') or request.POST.get('exam')
     selected_exam = None
@@ -575,25 +826,59 @@ def student_mark_entry(request, student_id):
         selected_exam = get_object_or_404(Exam, pk=selected_exam_id)
     form = None
     if selected_exam:
+        existing = student_marks(student, selected_exam)
         if request.method == 'POST':
             form = StudentMarksEntryForm(subjects, request.POST)
             if form.is_valid():
+                values = {}
                 for subject in subjects:
                     marks = form.cleaned_data.get(f'subject_{subject.pk}')
                     if marks is not None:
-                        Mark.objects.update_or_create(
-                            student=student,
-                            exam=selected_exam,
-                            subject=subject,
-                            defaults={'marks_obtained': marks}
-                        )
+                        values[subject.pk] = marks
+                save_student_marks(student, selected_exam, values)
                 messages.success(request, 'Marks saved successfully.')
-                return redirect('section_marks_entry', section_id=section.pk)
+                return redirect(f"{reverse('section_marks_entry', args=[section.pk])}?exam={selected_exam.pk}")
         else:
-            form = StudentMarksEntryForm(subjects)
+            form = StudentMarksEntryForm(subjects, initial={
+                f'subject_{subject_id}': value for subject_id, value in existing.items()
+            })
     return render(request, 'core/student_mark_entry.html', {
         'student': student,
         'form': form,
         'selected_exam': selected_exam,
         'exams': exams,
-    })
\ No newline at end of file
+    })
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def student_marks_api(request, student_id):
+    """
+    GET ?exam=<id> returns the student's marks for that exam.
+    POST {"exam": <id>, "marks": {"<subject_id>": <marks>, ...}} saves the changed ones.
+    """
+    student = get_object_or_404(Student, pk=student_id)
+    if request.method == 'POST':
+        try:
+            payload = json.loads(request.body)
+            exam_id = int(payload['exam'])
+            submitted = payload.get('marks', {})
+            values = {int(subject_id): float(value) for subject_id, value in submitted.items() if value is not None}
+        except (ValueError, TypeError, KeyError, AttributeError, OverflowError):
+            return JsonResponse({'error': 'Expected {"exam": id, "marks": {subject_id: marks}}.'}, status=400)
+    else:
+        try:
+            exam_id = int(request.GET['exam'])
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'Expected ?exam=<id>.'}, status=400)
+    exam = get_object_or_404(Exam, pk=exam_id)
+    if request.method == 'POST':
+        allowed = set(student.class_section.subjects.values_list('pk', flat=True))
+        invalid = sorted(subject_id for subject_id, value in values.items()
+                         if subject_id not in allowed or not valid_mark(value))
+        if invalid:
+            return JsonResponse({'error': f'Invalid subjects or marks (0 to {MAX_MARKS_PER_SUBJECT}).',
+                                 'subjects': invalid}, status=400)
+        saved, unchanged = save_student_marks(student, exam, values)
+        return JsonResponse({'saved': saved, 'unchanged': unchanged, 'marks': student_marks(student, exam)})
+    return JsonResponse({'marks': student_marks(student, exam)})
@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'student_management.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.WARM_TEMPLATES:
+    # Pay for template compilation before the first request, not during it
+    from core.templating import warm_templates  # noqa: E402
+    warm_templates()
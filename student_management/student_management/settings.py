@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # === Base Directory ===
@@ -23,42 +24,136 @@ INSTALLED_APPS = [
 # === Middleware ===
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReadOnlyRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.QueryMetricsMiddleware',
 ]
 
 # === URL & WSGI Config ===
 ROOT_URLCONF = 'student_management.urls'
 WSGI_APPLICATION = 'student_management.wsgi.application'
+# Serve core.async_views for the read-heavy pages (only useful under ASGI)
+ASYNC_VIEWS = os.environ.get('SMS_ASYNC_VIEWS', '0') == '1'
 
 # === Templates ===
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.templating.fragment_version',
+            ],
+            # Compile each template once per process; runserver still picks up edits
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
 ]
 
+# Compile all core templates when a worker loads wsgi.py/asgi.py (core.templating.warm_templates)
+WARM_TEMPLATES = os.environ.get('SMS_WARM_TEMPLATES', '1') == '1'
+
 # === Database ===
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SMS_DB_PATH', str(BASE_DIR / 'db.sqlite3')),
+        # The web server and the run_jobs worker write concurrently; a deferred
+        # transaction that reads first can then fail to upgrade to a write lock
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
+# SMS_DB_MODE=production: WAL with tuned pragmas, persistent connections, a
+# read-only connection for GET requests and one queued writer.
+SMS_DB_MODE = os.environ.get('SMS_DB_MODE', 'development')
+if SMS_DB_MODE == 'production':
+    SQLITE_PRAGMAS = [
+        'PRAGMA journal_mode=WAL',          # readers no longer block behind the writer
+        'PRAGMA synchronous=NORMAL',        # durable at checkpoints; safe with WAL
+        'PRAGMA busy_timeout=5000',
+        'PRAGMA cache_size=-65536',         # 64 MiB page cache per connection
+        'PRAGMA mmap_size=268435456',       # 256 MiB memory-mapped reads
+        'PRAGMA temp_store=MEMORY',
+    ]
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('SMS_DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(SQLITE_PRAGMAS),
+            # Take the write lock at BEGIN, so a transaction never fails upgrading a read lock
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+    })
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'OPTIONS': {
+            'init_command': ';'.join(SQLITE_PRAGMAS + ['PRAGMA query_only=ON']),
+            'timeout': 20,
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['core.database.ReadWriteRouter']
+    # Writers from every worker process queue on this file (see core.database.write_lock)
+    SQLITE_WRITE_LOCK = os.environ.get('SMS_DB_WRITE_LOCK', DATABASES['default']['NAME'] + '.write-lock')
+
+# === Cache ===
+# SMS_CACHE selects the backend: "file" (default), a redis:// URL (Redis or
+# any compatible server, needs the redis package) or "locmem". Cached results
+# and dashboards are invalidated by whichever process writes, so every process
+# serving the site must share the cache: "file" does on one host, Redis across
+# hosts. "locmem" is private to each process and only allowed with DEBUG, for
+# a single runserver with SMS_JOBS_INLINE=1.
+SMS_CACHE = os.environ.get('SMS_CACHE', 'file')
+if SMS_CACHE.startswith(('redis://', 'rediss://', 'unix://')):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': SMS_CACHE}}
+elif SMS_CACHE == 'file':
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('SMS_CACHE_DIR', str(BASE_DIR / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }}
+else:
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }}
+
+# === Sessions ===
+# SMS_SESSIONS=cache keeps sessions in the cache, written through to the
+# database so they survive a cache flush; signed_cookies keeps them in the
+# browser and needs no storage at all.
+SMS_SESSIONS = os.environ.get('SMS_SESSIONS', 'cache')
+SESSION_ENGINE = {
+    'cache': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[SMS_SESSIONS]
+
+# === Background Jobs ===
+# Imports, exports and ID card PDFs are queued as core.models.Job rows and run
+# by `manage.py run_jobs`. SMS_JOBS_INLINE=1 runs them inside the request
+# instead, for development without a worker.
+JOB_ROOT = Path(os.environ.get('SMS_JOB_ROOT', BASE_DIR / 'jobs'))
+JOBS_INLINE = os.environ.get('SMS_JOBS_INLINE', '0') == '1'
+JOB_WORKERS = int(os.environ.get('SMS_JOB_WORKERS', 0)) or None
+# Processes hashing passwords during bulk student onboarding (default: CPU count)
+ONBOARDING_HASH_WORKERS = int(os.environ.get('SMS_ONBOARDING_WORKERS', 0)) or None
+
 # === Password Validation ===
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -82,3 +177,9 @@ MEDIA_ROOT = BASE_DIR / 'media'
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/admin/login/'
+# Serves request.user (with its student profile) from the cache; see core.auth.
+# Only with a shared cache: a password change or deactivation must reach every
+# worker, not just the one that saved it.
+AUTHENTICATION_BACKENDS = [
+    'django.contrib.auth.backends.ModelBackend' if SMS_CACHE == 'locmem' else 'core.auth.CachedModelBackend',
+]